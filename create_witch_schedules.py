@@ -8,33 +8,31 @@ Create detailed schedules for each witch showing complete timeline:
 - Account for ALL tickets with proper travel time calculations
 """
 
-import json
+import sys
 from datetime import datetime, timedelta
+from operator import itemgetter
+
+from data_utils import load_json, save_json, build_travel_times, format_timestamp
+
+# Large outputs are written as compact JSON; pass --pretty for indented output
+PRETTY_JSON = '--pretty' in sys.argv[1:]
 
 # Load data
 print("Loading data...")
-with open('cauldrons.json', 'r') as f:
-    cauldrons_data = json.load(f)
-
-with open('transport_tickets.json', 'r') as f:
-    tickets_data = json.load(f)
+cauldrons_data = load_json('cauldrons.json')
+tickets_data = load_json('transport_tickets.json')
 
 cauldrons = {c['id']: c for c in cauldrons_data['cauldrons']}
 network_edges = cauldrons_data['network']['edges']
 tickets = tickets_data['transport_tickets']
 
-# Build travel time lookup
-travel_times = {}
-for edge in network_edges:
-    key = (edge['from'], edge['to'])
-    travel_times[key] = edge['travel_time_minutes']
-    travel_times[(edge['to'], edge['from'])] = edge['travel_time_minutes']
+# Travel times between locations (default 30 min if not found)
+get_travel_time = build_travel_times(cauldrons, network_edges)
 
-def get_travel_time(from_id, to_id):
-    """Get travel time between two locations"""
-    if from_id == to_id:
-        return 0
-    return travel_times.get((from_id, to_id), 30)  # Default 30 min if not found
+# Witches start every trip at the market and unload there afterwards,
+# so both legs only depend on the cauldron
+market_to_cauldron = {cauldron_id: get_travel_time('market_001', cauldron_id) for cauldron_id in cauldrons}
+cauldron_to_market = {cauldron_id: get_travel_time(cauldron_id, 'market_001') for cauldron_id in cauldrons}
 
 # Constants
 UNLOAD_TIME = 15  # Minutes to unload at market
@@ -57,26 +55,27 @@ for ticket in tickets:
         'collection_start': start,
         'collection_end': end,
         'collection_duration': collection_duration,
-        'amount': ticket.get('amount_collected', 0)
+        'amount': ticket.get('amount_collected', 0),
+        '_sort_key': int(start.timestamp())  # Integer compares sort faster than datetimes
     })
 
-# Sort tickets by start time for each witch
-for witch_id in tickets_by_witch:
-    tickets_by_witch[witch_id].sort(key=lambda x: x['collection_start'])
+# Sort tickets by start time for each witch, then drop the temporary key
+for ticket_list in tickets_by_witch.values():
+    ticket_list.sort(key=itemgetter('_sort_key'))
+    for ticket in ticket_list:
+        del ticket['_sort_key']
 
-# Create detailed schedules
-detailed_schedules = {}
-
-for witch_id, ticket_list in tickets_by_witch.items():
+def build_schedule(ticket_list):
+    """Build the detailed schedule for one witch from her time-sorted tickets"""
     schedule_entries = []
-    current_location = 'market_001'  # Start at market
+    prev_unload_complete = None  # Kept as a datetime so it is never re-parsed
     
     for i, ticket in enumerate(ticket_list):
         cauldron_id = ticket['cauldron_id']
         
-        # Calculate travel times
-        travel_to_cauldron = get_travel_time(current_location, cauldron_id)
-        travel_to_market = get_travel_time(cauldron_id, 'market_001')
+        # Calculate travel times (default 30 min for a cauldron missing from cauldrons.json)
+        travel_to_cauldron = market_to_cauldron.get(cauldron_id, 30)
+        travel_to_market = cauldron_to_market.get(cauldron_id, 30)
         
         if i == 0:
             # First ticket - calculate departure from market
@@ -85,9 +84,6 @@ for witch_id, ticket_list in tickets_by_witch.items():
             arrival_at_cauldron = ticket['collection_start']
         else:
             # Subsequent tickets - need to check when witch finishes previous task
-            prev_entry = schedule_entries[-1]
-            prev_unload_complete = datetime.fromisoformat(prev_entry['unload_complete'].replace('Z', '+00:00'))
-            
             # Calculate when witch can arrive at next cauldron
             earliest_arrival = prev_unload_complete + timedelta(minutes=travel_to_cauldron)
             
@@ -117,29 +113,32 @@ for witch_id, ticket_list in tickets_by_witch.items():
             'ticket_id': ticket['ticket_id'],
             'cauldron_id': cauldron_id,
             'amount_collected': ticket['amount'],
-            'departure_from_market': departure_from_market.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'departure_from_market': format_timestamp(departure_from_market),
             'travel_to_cauldron_minutes': travel_to_cauldron,
-            'arrival_at_cauldron': arrival_at_cauldron.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'collection_start': collection_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'arrival_at_cauldron': format_timestamp(arrival_at_cauldron),
+            'collection_start': format_timestamp(collection_start),
             'collection_duration_minutes': ticket['collection_duration'],
-            'collection_end': collection_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'departure_from_cauldron': departure_from_cauldron.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'collection_end': format_timestamp(collection_end),
+            'departure_from_cauldron': format_timestamp(departure_from_cauldron),
             'travel_to_market_minutes': travel_to_market,
-            'arrival_at_market': arrival_at_market.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'unload_start': unload_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'arrival_at_market': format_timestamp(arrival_at_market),
+            'unload_start': format_timestamp(unload_start),
             'unload_duration_minutes': UNLOAD_TIME,
-            'unload_complete': unload_complete.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'ready_for_next_task': unload_complete.strftime('%Y-%m-%dT%H:%M:%SZ')
+            'unload_complete': format_timestamp(unload_complete),
+            'ready_for_next_task': format_timestamp(unload_complete)
         }
         
         schedule_entries.append(schedule_entry)
-        current_location = 'market_001'  # After unloading, witch is at market
+        prev_unload_complete = unload_complete
     
-    detailed_schedules[witch_id] = {
+    return {
         'total_tickets': len(schedule_entries),
         'schedule': schedule_entries
     }
 
+# Create detailed schedules - each witch's schedule is independent of the others
+detailed_schedules = {witch_id: build_schedule(ticket_list) for witch_id, ticket_list in tickets_by_witch.items()}
+
 # Create output structure
 output = {
     'metadata': {
@@ -154,8 +153,7 @@ output = {
 
 # Save detailed schedules
 output_file = 'detailed_witch_schedules.json'
-with open(output_file, 'w') as f:
-    json.dump(output, f, indent=2)
+save_json(output_file, output, pretty=PRETTY_JSON)
 
 print(f"\n✅ Created detailed schedules in {output_file}")
 print(f"\nSummary:")
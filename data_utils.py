@@ -0,0 +1,252 @@
+"""
+Helpers shared by the data generation scripts:
+- Loading and saving JSON files (through orjson when it is installed)
+- Travel times between the market and cauldrons
+- Timestamp formatting
+- Reading the end of historical_data.json without decoding every minute
+- Writing it back with new minutes appended
+"""
+
+import json
+import mmap
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - fall back to the standard library
+    orjson = None
+
+def load_json(path):
+    """Load a JSON file, using orjson when it is installed"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_json(path, data, pretty=True):
+    """Save data as JSON (indented if pretty), using orjson when it is installed"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0))
+    elif pretty:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+def save_json_stream(path, data, list_key):
+    """Save data like save_json, writing the list under list_key (its last key) one item at a time
+
+    The items may be any iterable, so a generator can build them as they are written.
+    """
+    if orjson is not None:
+        def dumps(obj):
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    else:
+        def dumps(obj):
+            return json.dumps(obj, indent=2)
+    items = data[list_key]
+    head = {key: value for key, value in data.items() if key != list_key}
+    with open(path, 'w', encoding='utf-8') as f:
+        # Everything before the list, minus the closing brace
+        f.write(dumps(head)[:-2] + ',\n' if head else '{\n')
+        f.write(f'  {dumps(list_key)}: [')
+        separator = '\n    '
+        for item in items:
+            # Nest each item two levels deep, as it would be in the full document
+            f.write(separator + dumps(item).replace('\n', '\n    '))
+            separator = ',\n    '
+        # The separator only changes once an item has been written
+        f.write(']\n}' if separator == '\n    ' else '\n  ]\n}')
+
+def build_travel_times(cauldrons, network_edges, default=30):
+    """Build get_travel_time(from_id, to_id) for the market, the cauldrons and the network edges
+
+    Travel times live in a dense matrix indexed by location; pairs without an edge, and
+    locations outside the network, take the default.
+    """
+    locations = ['market_001'] + list(cauldrons)
+    for edge in network_edges:
+        for location_id in (edge['from'], edge['to']):
+            if location_id not in locations:
+                locations.append(location_id)
+    location_index = {location_id: i for i, location_id in enumerate(locations)}
+    travel_matrix = [[0 if i == j else default for j in range(len(locations))] for i in range(len(locations))]
+    for edge in network_edges:
+        from_idx, to_idx = location_index[edge['from']], location_index[edge['to']]
+        travel_matrix[from_idx][to_idx] = edge['travel_time_minutes']
+        travel_matrix[to_idx][from_idx] = edge['travel_time_minutes']
+    
+    def get_travel_time(from_id, to_id):
+        """Get travel time between two locations"""
+        if from_id == to_id:
+            return 0
+        from_idx, to_idx = location_index.get(from_id), location_index.get(to_id)
+        if from_idx is None or to_idx is None:
+            return default
+        return travel_matrix[from_idx][to_idx]
+    
+    return get_travel_time
+
+def format_timestamp(timestamp):
+    """Format a datetime as an ISO-8601 UTC string, like strftime('%Y-%m-%dT%H:%M:%SZ')"""
+    return (f"{timestamp.year:04d}-{timestamp.month:02d}-{timestamp.day:02d}"
+            f"T{timestamp.hour:02d}:{timestamp.minute:02d}:{timestamp.second:02d}Z")
+
+def dump_indented_json(data, depth=0):
+    """Serialize data as indented JSON bytes, nested `depth` levels deep"""
+    if orjson is not None:
+        text = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        text = json.dumps(data, indent=2).encode()
+    return text.replace(b'\n', b'\n' + b'  ' * depth)
+
+def dump_compact_json(data):
+    """Serialize data as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode()
+
+WHITESPACE = (b' ', b'\t', b'\r', b'\n')
+
+def _expect(mm, pos, token, path):
+    """Check that token comes next (after any whitespace) and return the position after it"""
+    while mm[pos:pos + 1] in WHITESPACE:
+        pos += 1
+    if mm[pos:pos + len(token)] != token:
+        raise ValueError(f"{path}: expected {token.decode()!r} at byte {pos}, "
+                         f"historical data must be laid out as {{\"metadata\": {{...}}, \"data\": [...]}}")
+    return pos + len(token)
+
+def _expect_before(mm, pos, token, path):
+    """Check that token comes just before pos (ignoring whitespace) and return its position"""
+    while mm[pos - 1:pos] in WHITESPACE:
+        pos -= 1
+    if mm[pos - len(token):pos] != token:
+        raise ValueError(f"{path}: expected {token.decode()!r} before byte {pos}, "
+                         f"historical data must end with the \"data\" list")
+    return pos - len(token)
+
+def iter_entries(entries):
+    """Decode the raw entries of a JSON list (without its brackets) one at a time"""
+    decoder = json.JSONDecoder()
+    text = entries.decode()
+    pos = 0
+    while True:
+        while text[pos:pos + 1].isspace():
+            pos += 1
+        entry, pos = decoder.raw_decode(text, pos)
+        yield entry
+        while text[pos:pos + 1].isspace():
+            pos += 1
+        if pos == len(text):
+            return
+        if text[pos] != ',':
+            raise ValueError(f"expected ',' between list entries at character {pos}")
+        pos += 1
+
+def load_historical_tail(path):
+    """Load the metadata and last entry of the historical data without parsing every minute
+
+    Returns (metadata, last_entry, existing_entries, existing_pretty, existing_count). Only the
+    metadata and the final entry are decoded; the existing minutes come back as raw bytes so they
+    can be written back unchanged. existing_pretty is True if they are indented the way
+    save_historical_data writes them, False if compact, and None for any other layout.
+    existing_count is the number of minutes in the "data" list.
+    Raises ValueError unless the file is a "metadata" object followed by a non-empty "data" list
+    whose length matches the metadata's total_minutes (when it has one).
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = _expect(mm, 0, b'{', path)
+            pos = _expect(mm, pos, b'"metadata"', path)
+            metadata_start = _expect(mm, pos, b':', path)
+            # The metadata values may contain "data" too, so take the first "data" key that
+            # directly follows a complete metadata object
+            data_key = metadata_start
+            while True:
+                data_key = mm.find(b'"data"', data_key + 1)
+                if data_key < 0:
+                    raise ValueError(f"{path}: no \"data\" list after the metadata")
+                text = mm[metadata_start:data_key].decode()
+                try:
+                    metadata, end = decoder.raw_decode(text.lstrip())
+                except ValueError:
+                    continue
+                if isinstance(metadata, dict) and text.lstrip()[end:].strip() == ',':
+                    break
+            pos = _expect(mm, data_key + len(b'"data"'), b':', path)
+            data_start = _expect(mm, pos, b'[', path) - 1
+            
+            # The document has to close with the data list
+            data_end = _expect_before(mm, _expect_before(mm, len(mm), b'}', path), b']', path)
+            entries_end = data_end
+            while mm[entries_end - 1:entries_end] in WHITESPACE:
+                entries_end -= 1
+            
+            # The last entry is the object that runs right up to the end of the list and
+            # follows a comma or the opening bracket
+            brace = entries_end
+            while True:
+                brace = mm.rfind(b'{', data_start, brace)
+                if brace < 0:
+                    raise ValueError(f"{path}: the \"data\" list has no entries")
+                text = mm[brace:entries_end].decode()
+                try:
+                    last_entry, end = decoder.raw_decode(text)
+                except ValueError:
+                    continue
+                before = brace
+                while mm[before - 1:before] in WHITESPACE:
+                    before -= 1
+                if (end == len(text) and isinstance(last_entry, dict) and 'timestamp' in last_entry
+                        and mm[before - 1:before] in (b',', b'[')):
+                    break
+            existing_entries = mm[data_start + 1:entries_end]
+    if existing_entries.startswith(b'\n    {'):
+        existing_pretty = True
+        # Raw newlines can't appear inside JSON strings and nested objects are indented
+        # deeper, so each minute is the only thing starting a line with four spaces and a brace
+        existing_count = existing_entries.count(b'\n    {')
+    else:
+        existing_pretty = False if existing_entries.startswith(b'{') else None
+        existing_count = sum(1 for _ in iter_entries(existing_entries))
+    if metadata.get('total_minutes', existing_count) != existing_count:
+        raise ValueError(f"{path}: metadata says {metadata['total_minutes']} minutes "
+                         f"but the \"data\" list has {existing_count}")
+    return metadata, last_entry, existing_entries, existing_pretty, existing_count
+
+def save_historical_data(path, metadata, existing_entries, new_entries, pretty=True, existing_pretty=True):
+    """Save the historical data, copying the existing minutes through as raw bytes
+
+    Existing minutes laid out differently from the output (existing_pretty != pretty) are
+    re-encoded one at a time, so the whole file uses one layout without ever decoding the
+    full list.
+    """
+    with open(path, 'wb') as f:
+        if pretty:
+            f.write(b'{\n  "metadata": ' + dump_indented_json(metadata, 1) + b',\n  "data": [')
+            if existing_pretty:
+                f.write(existing_entries)
+            else:
+                separator = b'\n    '
+                for entry in iter_entries(existing_entries):
+                    f.write(separator + dump_indented_json(entry, 2))
+                    separator = b',\n    '
+            for entry in new_entries:
+                f.write(b',\n    ' + dump_indented_json(entry, 2))
+            f.write(b'\n  ]\n}')
+        else:
+            f.write(b'{"metadata":' + dump_compact_json(metadata) + b',"data":[')
+            if existing_pretty is False:
+                f.write(existing_entries)
+            else:
+                separator = b''
+                for entry in iter_entries(existing_entries):
+                    f.write(separator + dump_compact_json(entry))
+                    separator = b','
+            for entry in new_entries:
+                f.write(b',' + dump_compact_json(entry))
+            f.write(b']}')
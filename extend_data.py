@@ -4,24 +4,22 @@ Extend historical data and tickets by 2 more days
 Maintains all constraints: fill rates, witch shifts, travel times, suspicious tickets, unreported drains
 """
 
-import json
 import random
+from heapq import heappop, heappush
+from bisect import bisect_right
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from data_utils import (load_json, save_json, build_travel_times, format_timestamp,
+                        load_historical_tail, save_historical_data)
+
 # Load existing data
 print("Loading existing data...")
-with open('historical_data.json', 'r') as f:
-    historical_data = json.load(f)
-
-with open('cauldrons.json', 'r') as f:
-    cauldrons_data = json.load(f)
-
-with open('transport_tickets.json', 'r') as f:
-    tickets_data = json.load(f)
-
-with open('unreported_drains.json', 'r') as f:
-    unreported_data = json.load(f)
+historical_metadata, last_entry, existing_historical_entries, existing_pretty, existing_minutes = (
+    load_historical_tail('historical_data.json'))
+cauldrons_data = load_json('cauldrons.json')
+tickets_data = load_json('transport_tickets.json')
+unreported_data = load_json('unreported_drains.json')
 
 # Extract data
 cauldrons = {c['id']: c for c in cauldrons_data['cauldrons']}
@@ -31,25 +29,14 @@ existing_tickets = tickets_data['transport_tickets']
 existing_unreported = unreported_data['unreported_drains']
 
 # Get last entry from historical data
-last_entry = historical_data['data'][-1]
 last_timestamp = datetime.fromisoformat(last_entry['timestamp'].replace('Z', '+00:00'))
-initial_levels = {k: v for k, v in last_entry['cauldron_levels'].items()}
+initial_levels = last_entry['cauldron_levels']  # Only read, so no copy is needed
 
 print(f"Last timestamp: {last_timestamp}")
 print(f"Starting levels: {initial_levels}")
 
-# Build travel time lookup
-travel_times = {}
-for edge in network_edges:
-    key = (edge['from'], edge['to'])
-    travel_times[key] = edge['travel_time_minutes']
-    travel_times[(edge['to'], edge['from'])] = edge['travel_time_minutes']
-
-def get_travel_time(from_id, to_id):
-    """Get travel time between two locations"""
-    if from_id == to_id:
-        return 0
-    return travel_times.get((from_id, to_id), 30)  # Default 30 min
+# Travel times between locations (default 30 min if not found)
+get_travel_time = build_travel_times(cauldrons, network_edges)
 
 # Define fill rates per cauldron (liters per minute) - from analyzing original data
 fill_rates = {
@@ -89,6 +76,10 @@ UNLOAD_TIME = 15  # minutes
 MAX_CAPACITY_PER_WITCH = 6000  # liters
 NOISE_VARIATION = 0.03  # 3% noise (3-5% variation range)
 
+# Dedicated seeded generator - bound methods are passed into the hot loop
+# and the generated data is reproducible
+rng = random.Random(45678)
+
 # Witches by shift
 witches_by_shift = defaultdict(list)
 for courier in couriers:
@@ -105,37 +96,56 @@ def get_witch_shift(timestamp):
     else:
         return 3
 
-def is_witch_available(witch_id, start_time, end_time, witch_schedules):
-    """Check if a witch is available during a time period"""
-    if witch_id not in witch_schedules:
-        return True
-    for event in witch_schedules[witch_id]:
-        event_start = event.get('departure_from_market') or event.get('collection_start')
-        event_end = event.get('unload_complete') or event.get('collection_end')
-        if event_start and event_end:
-            # Check for overlap
-            if not (end_time <= event_start or start_time >= event_end):
-                return False
-    return True
+def fill_levels(levels, rates, max_volumes, uniform=rng.uniform):
+    """Apply one minute of filling to every cauldron level in place"""
+    for i, (level, fill_rate, max_vol) in enumerate(zip(levels, rates, max_volumes)):
+        # Add filling (with noise - 3-5% variation like original data)
+        # Use range: 0.97 to 1.03 for ~3% variation, matching original data pattern
+        levels[i] = min(level + (fill_rate * uniform(0.97, 1.03)), max_vol)
+
+def is_witch_available(witch_id, start_time):
+    """Check if a witch is free to start a trip at start_time"""
+    # Trips are scheduled in chronological order, so a witch is free once
+    # her latest trip has been unloaded
+    next_free = witch_next_free.get(witch_id)
+    return next_free is None or next_free <= start_time
 
 # Generate 2 days of data (2880 minutes)
 new_start = last_timestamp + timedelta(minutes=1)
 new_end = new_start + timedelta(days=2) - timedelta(minutes=1)
 
+def get_minute_index(timestamp):
+    """Get the index of a timestamp in the new minute-by-minute data"""
+    return int((timestamp - new_start).total_seconds() // 60)
+
 print(f"\nGenerating data from {new_start} to {new_end}")
 print(f"Total minutes to generate: {(new_end - new_start).total_seconds() / 60:.0f}")
 
-# Initialize
-new_historical_data_entries = []
+# Initialize - new minutes are kept as a timestamp list and parallel rows of
+# levels (in cauldron_ids order) and only turned into entry dicts when saved
+new_timestamps = []
+new_level_rows = []
 new_tickets = []
 new_unreported_drains = []
 witch_schedules = defaultdict(list)
+witch_next_free = {}  # Witch ID -> when her latest trip is unloaded
 ticket_counter = max([int(t['ticket_id'].split('_')[-1]) for t in existing_tickets], default=0)
 
-# Track levels as we generate
-current_levels = {k: v for k, v in initial_levels.items()}
+# Track levels as we generate - parallel lists indexed by cauldron position
+# so the per-minute fill works on plain lists instead of nested dict lookups
+cauldron_ids = list(initial_levels.keys())
+cauldron_index = {cauldron_id: i for i, cauldron_id in enumerate(cauldron_ids)}
+cauldron_max_volumes = [cauldrons[cauldron_id]['max_volume'] for cauldron_id in cauldron_ids]
+cauldron_fill_rates = [fill_rates[cauldron_id] for cauldron_id in cauldron_ids]
+current_levels = [initial_levels[cauldron_id] for cauldron_id in cauldron_ids]
+# Levels at which a collection is triggered (threshold or 99% of capacity)
+cauldron_threshold_levels = [collection_thresholds[cauldron_id] * max_vol
+                             for cauldron_id, max_vol in zip(cauldron_ids, cauldron_max_volumes)]
+cauldron_capacity_levels = [max_vol * 0.99 for max_vol in cauldron_max_volumes]
 
 # Track pending collections (scheduled but not yet applied)
+# Heap of (end, cauldron index, collection) - a cauldron only has one collection
+# in progress at a time, so the index breaks ties between equal end times
 pending_collections = []
 
 # Track which cauldrons need collection
@@ -143,27 +153,16 @@ cauldrons_needing_collection = {}
 
 # Generate data minute by minute
 current_time = new_start
-minute_index = 0
 
 while current_time <= new_end:
     # Update levels based on fill rates
-    minute_levels = {}
-    for cauldron_id, current_level in current_levels.items():
-        max_vol = cauldrons[cauldron_id]['max_volume']
-        fill_rate = fill_rates[cauldron_id]
-        
-        # Add filling (with noise - 3-5% variation like original data)
-        # Use range: 0.97 to 1.03 for ~3% variation, matching original data pattern
-        noise = random.uniform(0.97, 1.03)
-        new_level = min(current_level + (fill_rate * noise), max_vol)
-        minute_levels[cauldron_id] = round(new_level, 2)
-        current_levels[cauldron_id] = new_level
+    fill_levels(current_levels, cauldron_fill_rates, cauldron_max_volumes)
+    minute_levels = [round(level, 2) for level in current_levels]
     
     # Check for collections needed
-    for cauldron_id, level in minute_levels.items():
-        max_vol = cauldrons[cauldron_id]['max_volume']
-        threshold = collection_thresholds[cauldron_id] * max_vol
-        at_capacity = level >= max_vol * 0.99
+    for cauldron_id, level, threshold, capacity_level in zip(
+            cauldron_ids, minute_levels, cauldron_threshold_levels, cauldron_capacity_levels):
+        at_capacity = level >= capacity_level
         
         # Check if we need a collection (and haven't already scheduled one)
         if (level >= threshold or at_capacity) and cauldron_id not in cauldrons_needing_collection:
@@ -175,25 +174,15 @@ while current_time <= new_end:
                 # Try to find an available witch
                 witch_id = None
                 for w in available_witches:
-                    # Estimate timing
-                    travel_to = get_travel_time('market_001', cauldron_id)
-                    collection_duration = random.randint(50, 90)
-                    travel_back = get_travel_time(cauldron_id, 'market_001')
-                    
-                    departure = current_time
-                    collection_start = current_time + timedelta(minutes=travel_to)
-                    collection_end = collection_start + timedelta(minutes=collection_duration)
-                    arrival_back = collection_end + timedelta(minutes=travel_back)
-                    unload_complete = arrival_back + timedelta(minutes=UNLOAD_TIME)
-                    
-                    if is_witch_available(w, departure, unload_complete, witch_schedules):
+                    # Trips depart now, so the witch only has to be back from her last one
+                    if is_witch_available(w, current_time):
                         witch_id = w
                         break
                 
                 if witch_id:
                     # Schedule the collection
                     travel_to = get_travel_time('market_001', cauldron_id)
-                    collection_duration = random.randint(50, 90)
+                    collection_duration = rng.randint(50, 90)
                     travel_back = get_travel_time(cauldron_id, 'market_001')
                     
                     departure = current_time
@@ -204,7 +193,7 @@ while current_time <= new_end:
                     
                     # Calculate collection amount
                     level_at_collection = level + (fill_rates[cauldron_id] * travel_to)
-                    collection_percentage = random.uniform(0.60, 0.80)
+                    collection_percentage = rng.uniform(0.60, 0.80)
                     amount_to_collect = min(level_at_collection * collection_percentage, MAX_CAPACITY_PER_WITCH)
                     
                     # Account for filling during collection
@@ -223,33 +212,35 @@ while current_time <= new_end:
                         'witch_id': witch_id
                     }
                     witch_schedules[witch_id].append(schedule_event)
-                    pending_collections.append({
+                    witch_next_free[witch_id] = unload_complete
+                    heappush(pending_collections, (collection_end, cauldron_index[cauldron_id], {
                         'cauldron_id': cauldron_id,
                         'start': collection_start,
                         'end': collection_end,
                         'amount': actual_drain,
                         'witch_id': witch_id
-                    })
+                    }))
                     
                     # Determine if suspicious (12% chance)
-                    is_suspicious = random.random() < 0.12
+                    is_suspicious = rng.random() < 0.12
                     reported_amount = actual_drain
                     
                     if is_suspicious:
                         # Underreported: ticket reports less than actual
-                        underreport_factor = random.uniform(0.75, 0.92)
+                        underreport_factor = rng.uniform(0.75, 0.92)
                         reported_amount = actual_drain * underreport_factor
                     
                     # Create ticket
                     ticket_counter += 1
-                    date_str = collection_start.strftime('%Y%m%d')
+                    collection_start_timestamp = format_timestamp(collection_start)
+                    date_str = collection_start_timestamp[:10].replace('-', '')  # YYYYMMDD
                     ticket_id = f"TT_{date_str}_{ticket_counter:03d}"
                     
                     ticket = {
                         'ticket_id': ticket_id,
                         'cauldron_id': cauldron_id,
-                        'collection_start_timestamp': collection_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'collection_timestamp': collection_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                        'collection_start_timestamp': collection_start_timestamp,
+                        'collection_timestamp': format_timestamp(collection_end),
                         'amount_collected': round(reported_amount, 2),
                         'courier_id': witch_id,
                         'status': 'completed',
@@ -269,9 +260,13 @@ while current_time <= new_end:
         if current_time >= cauldrons_needing_collection[cauldron_id]:
             del cauldrons_needing_collection[cauldron_id]
     
+    # Remove completed drains
+    while pending_collections and pending_collections[0][0] < current_time:
+        heappop(pending_collections)
+    
     # Apply any active drains to levels (before storing)
-    for drain in list(pending_collections):
-        if drain['start'] <= current_time <= drain['end']:
+    for _, _, drain in pending_collections:
+        if drain['start'] <= current_time:
             # Drain is active
             drain_duration = (drain['end'] - drain['start']).total_seconds() / 60
             if drain_duration > 0:
@@ -281,69 +276,73 @@ while current_time <= new_end:
                 # Net drain = drain rate - fill rate (accounting for continuous filling)
                 net_drain_rate = drain_rate_per_minute - fill_rates[drain['cauldron_id']]
                 if net_drain_rate > 0:
-                    minute_levels[drain['cauldron_id']] = max(0, minute_levels[drain['cauldron_id']] - net_drain_rate)
-                    current_levels[drain['cauldron_id']] = minute_levels[drain['cauldron_id']]
-        
-        # Remove completed drains
-        if current_time > drain['end']:
-            pending_collections.remove(drain)
+                    i = cauldron_index[drain['cauldron_id']]
+                    minute_levels[i] = max(0, minute_levels[i] - net_drain_rate)
+                    current_levels[i] = minute_levels[i]
     
     # Store this minute's data
-    new_historical_data_entries.append({
-        'timestamp': current_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
-        'cauldron_levels': minute_levels.copy()
-    })
+    new_timestamps.append(current_time)
+    new_level_rows.append(minute_levels)
     
     current_time += timedelta(minutes=1)
-    minute_index += 1
 
 # Add unreported drains (3-4 instances)
 print("\nAdding unreported drains...")
-unreported_count = random.randint(3, 4)
+unreported_count = rng.randint(3, 4)
 
-# Build a set of busy times from scheduled collections
-busy_times = set()
+# Build sorted, non-overlapping busy intervals from scheduled collections
+busy_periods = []
 for witch_id, events in witch_schedules.items():
     for event in events:
         start = event.get('collection_start') or event.get('departure_from_market')
         end = event.get('unload_complete') or event.get('collection_end')
         if start and end:
-            # Mark all minutes in this range as busy
-            t = start
-            while t <= end:
-                busy_times.add(t)
-                t += timedelta(minutes=1)
+            busy_periods.append((start, end))
+
+busy_intervals = []
+for start, end in sorted(busy_periods):
+    if busy_intervals and start <= busy_intervals[-1][1]:
+        # Merge with the previous interval
+        busy_intervals[-1][1] = max(busy_intervals[-1][1], end)
+    else:
+        busy_intervals.append([start, end])
+busy_starts = [start for start, end in busy_intervals]
+
+def is_busy(timestamp):
+    """Check if a timestamp falls within any scheduled collection"""
+    i = bisect_right(busy_starts, timestamp) - 1
+    return i >= 0 and timestamp <= busy_intervals[i][1]
 
 # Find times for unreported drains (when no collections are happening)
 selected_unreported = []
+drain_times_by_cauldron = defaultdict(list)  # Cauldron ID -> selected drain times
 for attempt in range(20):  # Try up to 20 times to find good spots
-    hour_offset = random.randint(6, 42)  # Avoid very early/late hours
+    hour_offset = rng.randint(6, 42)  # Avoid very early/late hours
     check_time = new_start + timedelta(hours=hour_offset)
     
     # Skip if this time is busy
-    if check_time in busy_times:
+    if is_busy(check_time):
         continue
     
-    # Find level at this time
+    # Find level at this time (entries are one minute apart starting at new_start)
     level_at_time = None
-    for entry in new_historical_data_entries:
-        ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-        if abs((ts - check_time).total_seconds()) < 60:
-            level_at_time = entry['cauldron_levels']
-            break
+    check_idx = get_minute_index(check_time)
+    if 0 <= check_idx < len(new_level_rows):
+        level_at_time = new_level_rows[check_idx]
     
     if level_at_time:
         # Pick a random cauldron with sufficient level
-        candidates = [(cid, lvl) for cid, lvl in level_at_time.items() if lvl > 150]
+        candidates = [(cid, lvl) for cid, lvl in zip(cauldron_ids, level_at_time) if lvl > 150]
         if candidates:
-            cauldron_id, level = random.choice(candidates)
+            cauldron_id, level = rng.choice(candidates)
             # Check if we already have a drain for this cauldron nearby
+            # (attempts are not chronological, so compare against all of them)
             too_close = any(
-                d['cauldron_id'] == cauldron_id and
-                abs((datetime.fromisoformat(d['drain_start_timestamp'].replace('Z', '+00:00')) - check_time).total_seconds()) < 14400
-                for d in selected_unreported
+                abs((drain_time - check_time).total_seconds()) < 14400
+                for drain_time in drain_times_by_cauldron[cauldron_id]
             )
             if not too_close:
+                drain_times_by_cauldron[cauldron_id].append(check_time)
                 selected_unreported.append({
                     'time': check_time,
                     'cauldron_id': cauldron_id,
@@ -356,38 +355,36 @@ for attempt in range(20):  # Try up to 20 times to find good spots
 for drain_info in selected_unreported:
     cauldron_id = drain_info['cauldron_id']
     drain_start = drain_info['time']
-    drain_duration = random.randint(50, 80)
+    drain_duration = rng.randint(50, 80)
     drain_end = drain_start + timedelta(minutes=drain_duration)
     
     # Find level at start
     level_at_start = None
-    for entry in new_historical_data_entries:
-        ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-        if abs((ts - drain_start).total_seconds()) < 60:
-            level_at_start = entry['cauldron_levels'].get(cauldron_id, 0)
-            break
+    level_idx = cauldron_index[cauldron_id]
+    start_idx = get_minute_index(drain_start)
+    end_idx = min(get_minute_index(drain_end), len(new_level_rows) - 1)
+    if 0 <= start_idx < len(new_level_rows):
+        level_at_start = new_level_rows[start_idx][level_idx]
     
     if level_at_start and level_at_start > 50:
         fill_during_drain = fill_rates[cauldron_id] * drain_duration
-        drain_amount = min(random.uniform(150, 350), level_at_start * 0.6)
+        drain_amount = min(rng.uniform(150, 350), level_at_start * 0.6)
         actual_drain = drain_amount
         
         # Apply drain to historical data
-        for entry in new_historical_data_entries:
-            ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-            if drain_start <= ts <= drain_end:
-                drain_duration_min = (drain_end - drain_start).total_seconds() / 60
-                if drain_duration_min > 0:
-                    drain_rate = (actual_drain / drain_duration_min)
-                    net_drain_rate = drain_rate - fill_rates[cauldron_id]
-                    if net_drain_rate > 0:
-                        entry['cauldron_levels'][cauldron_id] = max(0, 
-                            entry['cauldron_levels'][cauldron_id] - net_drain_rate)
+        for idx in range(start_idx, end_idx + 1):
+            row = new_level_rows[idx]
+            drain_duration_min = (drain_end - drain_start).total_seconds() / 60
+            if drain_duration_min > 0:
+                drain_rate = (actual_drain / drain_duration_min)
+                net_drain_rate = drain_rate - fill_rates[cauldron_id]
+                if net_drain_rate > 0:
+                    row[level_idx] = max(0, row[level_idx] - net_drain_rate)
         
         new_unreported_drains.append({
             'cauldron_id': cauldron_id,
-            'drain_start_timestamp': drain_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'drain_end_timestamp': drain_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'drain_start_timestamp': format_timestamp(drain_start),
+            'drain_end_timestamp': format_timestamp(drain_end),
             'estimated_amount_drained_liters': round(actual_drain, 2),
             'duration_minutes': drain_duration,
             'note': 'NO TICKET EXISTS - this is an unreported drain'
@@ -395,10 +392,9 @@ for drain_info in selected_unreported:
 
 # Merge with existing data
 print("\nMerging data...")
-historical_data['data'].extend(new_historical_data_entries)
-historical_data['metadata']['end_date'] = new_end.strftime('%Y-%m-%dT%H:%M:%SZ')
-historical_data['metadata']['total_minutes'] = len(historical_data['data'])
-historical_data['metadata']['total_collections'] = len(existing_tickets) + len(new_tickets)
+historical_metadata['end_date'] = format_timestamp(new_end)
+historical_metadata['total_minutes'] = existing_minutes + len(new_level_rows)
+historical_metadata['total_collections'] = len(existing_tickets) + len(new_tickets)
 
 # Merge tickets
 tickets_data['transport_tickets'].extend(new_tickets)
@@ -409,17 +405,17 @@ unreported_data['metadata']['total_unreported_drains'] = len(unreported_data['un
 
 # Save updated files
 print("\nSaving updated files...")
-with open('historical_data.json', 'w') as f:
-    json.dump(historical_data, f, indent=2)
-
-with open('transport_tickets.json', 'w') as f:
-    json.dump(tickets_data, f, indent=2)
-
-with open('unreported_drains.json', 'w') as f:
-    json.dump(unreported_data, f, indent=2)
+new_historical_data_entries = (
+    {'timestamp': format_timestamp(timestamp), 'cauldron_levels': dict(zip(cauldron_ids, row))}
+    for timestamp, row in zip(new_timestamps, new_level_rows)
+)
+save_historical_data('historical_data.json', historical_metadata, existing_historical_entries,
+                     new_historical_data_entries, existing_pretty=existing_pretty)
+save_json('transport_tickets.json', tickets_data)
+save_json('unreported_drains.json', unreported_data)
 
 print(f"\n✅ Extension complete!")
-print(f"   Added {len(new_historical_data_entries)} minutes of historical data")
+print(f"   Added {len(new_level_rows)} minutes of historical data")
 print(f"   Added {len(new_tickets)} new transport tickets")
 print(f"   Added {len(new_unreported_drains)} new unreported drains")
 suspicious_count = sum(1 for t in new_tickets if t.get('is_suspicious'))
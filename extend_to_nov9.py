@@ -8,41 +8,28 @@ Extend data from Nov 7 to end of Nov 9 (2 days)
 - All constraints maintained
 """
 
-import json
 import random
+from bisect import bisect_left, insort
 from datetime import datetime, timedelta, timezone
-from collections import defaultdict
+from heapq import nlargest
+from collections import defaultdict, namedtuple
+
+from data_utils import load_json, save_json, build_travel_times, format_timestamp
 
 # Load data
 print("Loading existing data...")
-with open('historical_data.json', 'r') as f:
-    hist = json.load(f)
-
-with open('cauldrons.json', 'r') as f:
-    cauldrons_data = json.load(f)
-
-with open('transport_tickets.json', 'r') as f:
-    tickets_data = json.load(f)
-
-with open('unreported_drains.json', 'r') as f:
-    unreported_data = json.load(f)
+hist = load_json('historical_data.json')
+cauldrons_data = load_json('cauldrons.json')
+tickets_data = load_json('transport_tickets.json')
+unreported_data = load_json('unreported_drains.json')
 
 # Extract data
 cauldrons = {c['id']: c for c in cauldrons_data['cauldrons']}
 network_edges = cauldrons_data['network']['edges']
 couriers = cauldrons_data['couriers']
 
-# Build travel times
-travel_times = {}
-for edge in network_edges:
-    key = (edge['from'], edge['to'])
-    travel_times[key] = edge['travel_time_minutes']
-    travel_times[(edge['to'], edge['from'])] = edge['travel_time_minutes']
-
-def get_travel_time(from_id, to_id):
-    if from_id == to_id:
-        return 0
-    return travel_times.get((from_id, to_id), 30)
+# Travel times between locations (default 30 min if not found)
+get_travel_time = build_travel_times(cauldrons, network_edges)
 
 # Fill rates (from original data analysis)
 fill_rates = {
@@ -64,30 +51,36 @@ collection_thresholds = {
 UNLOAD_TIME = 15
 MAX_CAPACITY_PER_WITCH = 6000
 
+# A scheduled collection draining a cauldron, with bounds in minutes since the simulation start
+PendingDrain = namedtuple('PendingDrain', 'cauldron_idx start_minute end_minute drain_amount duration net_drain')
+
 # Witches by shift
 witches_by_shift = defaultdict(list)
 for courier in couriers:
     shift = courier['shift']
     witches_by_shift[shift].append(courier['courier_id'])
+witch_index = {courier['courier_id']: i for i, courier in enumerate(couriers)}
+
+# Shift 1 covers 00:00-08:00, shift 2 08:00-16:00 and shift 3 16:00-24:00
+SHIFT_BY_HOUR = (1,) * 8 + (2,) * 8 + (3,) * 8
 
 def get_witch_shift(timestamp):
-    hour = timestamp.hour
-    if 0 <= hour < 8:
-        return 1
-    elif 8 <= hour < 16:
-        return 2
-    else:
-        return 3
-
-def is_witch_available(witch_id, start_time, end_time, witch_schedules):
-    if witch_id not in witch_schedules:
-        return True
-    for event in witch_schedules[witch_id]:
-        event_start = event.get('departure_from_market') or event.get('collection_start')
-        event_end = event.get('unload_complete') or event.get('collection_end')
-        if event_start and event_end:
-            if not (end_time <= event_start or start_time >= event_end):
-                return False
+    return SHIFT_BY_HOUR[timestamp.hour]
+
+def fill_levels(levels, rates, max_volumes, uniform):
+    """Apply one minute of filling to every cauldron level in place"""
+    for i, (level, fill_rate, max_vol) in enumerate(zip(levels, rates, max_volumes)):
+        # Apply noise: 97% to 105% (3-5% variation)
+        levels[i] = min(level + fill_rate * uniform(0.97, 1.05), max_vol)
+
+def is_witch_available(trips, start_minute, end_minute):
+    # A witch's trips are (departure, unload_complete) minute pairs kept sorted and
+    # never overlapping, so only the trips either side of start_minute can clash
+    i = bisect_left(trips, (start_minute, start_minute))
+    if i > 0 and trips[i - 1][1] > start_minute:
+        return False
+    if i < len(trips) and trips[i][0] < end_minute:
+        return False
     return True
 
 # Get last entry
@@ -102,235 +95,254 @@ print(f"Initial levels: {initial_levels}")
 new_start = last_timestamp + timedelta(minutes=1)
 new_end = datetime(2024, 11, 9, 23, 59, 0, tzinfo=timezone.utc)
 
+def get_minute_index(timestamp):
+    # Generated minutes are one minute apart starting at new_start
+    return int((timestamp - new_start).total_seconds() // 60)
+
 print(f"\nGenerating data from {new_start} to {new_end}")
 print(f"Total minutes to generate: {(new_end - new_start).total_seconds() / 60:.0f}")
 
 # Initialize
-new_historical_data = []
-new_tickets = []
 new_unreported_drains = []
-witch_schedules = defaultdict(list)
 ticket_counter = max([int(t['ticket_id'].split('_')[-1]) for t in tickets_data['transport_tickets']], default=0)
 
-current_levels = {k: v for k, v in initial_levels.items()}
-pending_drains = []  # Active drains
-cauldrons_needing_collection = {}
-collections_per_cauldron = defaultdict(int)
-
-current_time = new_start
-random.seed(78901)  # For reproducibility
-
-while current_time <= new_end:
-    # Start with current levels
-    minute_levels = current_levels.copy()
+# Track levels as parallel lists indexed by cauldron position so the
+# per-minute fill works on plain lists instead of nested dict lookups
+cauldron_ids = list(initial_levels.keys())
+cauldron_index = {cauldron_id: i for i, cauldron_id in enumerate(cauldron_ids)}
+cauldron_max_volumes = [cauldrons[cauldron_id]['max_volume'] for cauldron_id in cauldron_ids]
+cauldron_fill_rates = [fill_rates[cauldron_id] for cauldron_id in cauldron_ids]
+current_levels = [initial_levels[cauldron_id] for cauldron_id in cauldron_ids]
+
+# Per-cauldron constants, hoisted out of the minute loop
+cauldron_threshold_levels = [collection_thresholds[cauldron_id] * max_vol
+                             for cauldron_id, max_vol in zip(cauldron_ids, cauldron_max_volumes)]
+cauldron_travel_to = [get_travel_time('market_001', cauldron_id) for cauldron_id in cauldron_ids]
+cauldron_travel_back = [get_travel_time(cauldron_id, 'market_001') for cauldron_id in cauldron_ids]
+
+def simulate(start, end, current_levels, ticket_counter, rng):
+    """Generate minute-by-minute levels and collection tickets from start to end"""
+    uniform, randint, rand = rng.uniform, rng.randint, rng.random
+    # Each minute is stored as a timestamp and a row of levels in cauldron_ids order;
+    # the entry dicts are only built when merging into the historical data
+    new_timestamps = []
+    new_level_rows = []
+    new_tickets = []
+    witch_trips = [[] for _ in couriers]  # By witch index: sorted (departure, unload_complete) minutes
+    pending_drains = []  # Active drains
+    cauldrons_needing_collection = {}
+    collections_per_cauldron = defaultdict(int)
+    # Running totals for the average collections per collected cauldron
+    total_collections = 0
+    collected_cauldron_count = 0
     
-    # Update levels with filling FIRST (WITH NOISE - 3-5% variation)
-    for cauldron_id, current_level in minute_levels.items():
-        max_vol = cauldrons[cauldron_id]['max_volume']
-        fill_rate = fill_rates[cauldron_id]
+    current_time = start
+    minute = 0  # Minutes since start, used for integer drain bookkeeping
+    while current_time <= end:
+        # Update levels with filling FIRST (WITH NOISE - 3-5% variation)
+        fill_levels(current_levels, cauldron_fill_rates, cauldron_max_volumes, uniform)
+        minute_levels = current_levels[:]  # Full precision - rounded when saved
         
-        # Apply noise: 97% to 105% (3-5% variation)
-        noise_factor = random.uniform(0.97, 1.05)
-        fill_amount = fill_rate * noise_factor
-        
-        new_level = min(current_level + fill_amount, max_vol)
-        minute_levels[cauldron_id] = round(new_level, 2)
-        current_levels[cauldron_id] = new_level
-    
-    # THEN apply any active drains (AFTER filling, so drain accounts for simultaneous filling)
-    for drain in list(pending_drains):
-        # Check if current_time is within drain period (direct datetime comparison)
-        if drain['start'] <= current_time <= drain['end']:
-            # Apply drain - calculate net drain per minute
-            # We want to achieve drain['net_drain'] total net reduction over the duration
-            net_drain = drain.get('net_drain', 0)
-            if drain['duration'] > 0 and net_drain > 0:
-                net_drain_per_min = net_drain / drain['duration']
-                current_cauldron_level = minute_levels[drain['cauldron_id']]
-                new_level = max(0, current_cauldron_level - net_drain_per_min)
-                minute_levels[drain['cauldron_id']] = round(new_level, 2)
-                current_levels[drain['cauldron_id']] = minute_levels[drain['cauldron_id']]
+        # THEN apply any active drains (AFTER filling, so drain accounts for simultaneous filling)
+        j = 0
+        while j < len(pending_drains):
+            drain = pending_drains[j]
+            # Check if this minute is within drain period (integer minute comparison)
+            if drain.start_minute <= minute <= drain.end_minute:
+                # Apply drain - calculate net drain per minute
+                # We want to achieve drain.net_drain total net reduction over the duration
+                net_drain = drain.net_drain
+                if drain.duration > 0 and net_drain > 0:
+                    net_drain_per_min = net_drain / drain.duration
+                    i = drain.cauldron_idx
+                    new_level = max(0, minute_levels[i] - net_drain_per_min)
+                    minute_levels[i] = new_level
+                    current_levels[i] = new_level
+            
+            # Remove completed drains by moving the last drain into their slot
+            if minute > drain.end_minute:
+                pending_drains[j] = pending_drains[-1]
+                pending_drains.pop()
+            else:
+                j += 1
         
-        # Remove completed drains
-        if current_time > drain['end']:
-            pending_drains.remove(drain)
-    
-    # Check for collections needed - balanced distribution
-    candidates_for_collection = []
-    
-    for cauldron_id, level in minute_levels.items():
-        max_vol = cauldrons[cauldron_id]['max_volume']
-        threshold = collection_thresholds[cauldron_id] * max_vol
-        at_capacity = level >= max_vol * 0.99
-        has_no_collections = collections_per_cauldron[cauldron_id] == 0
+        # Check for collections needed - balanced distribution
+        candidates_for_collection = []
         
-        if cauldron_id not in cauldrons_needing_collection:
-            priority = 0
-            if at_capacity:
-                priority = 100  # Must collect immediately - highest priority
-            elif level >= max_vol * 0.90:  # 90% full - very high priority
-                priority = 95
-            elif level >= threshold * 0.95:  # Near threshold - high priority
-                priority = 85
-            elif has_no_collections and level >= threshold * 0.80:
-                priority = 75
-            elif collections_per_cauldron[cauldron_id] < 2 and level >= threshold:
-                priority = 65
-            elif level >= threshold:
-                # Collect if this cauldron has fewer than average
-                avg = sum(collections_per_cauldron.values()) / max(1, len([c for c in collections_per_cauldron.values() if c > 0]))
-                if collections_per_cauldron[cauldron_id] < avg * 1.3:
-                    priority = 55
-            # Also trigger collections for cauldrons that haven't been collected in a while
-            elif collections_per_cauldron[cauldron_id] == 0 and level >= threshold * 0.70:
-                priority = 45
+        for i, (cauldron_id, level) in enumerate(zip(cauldron_ids, minute_levels)):
+            max_vol = cauldron_max_volumes[i]
+            threshold = cauldron_threshold_levels[i]
+            at_capacity = level >= max_vol * 0.99
+            has_no_collections = collections_per_cauldron[cauldron_id] == 0
             
-            if priority > 0:
-                candidates_for_collection.append((priority, cauldron_id, level))
-    
-    # Sort by priority (but also consider balance)
-    candidates_for_collection.sort(reverse=True)
-    
-    # Process top candidate, but try to balance
-    if candidates_for_collection:
+            if cauldron_id not in cauldrons_needing_collection:
+                priority = 0
+                if at_capacity:
+                    priority = 100  # Must collect immediately - highest priority
+                elif level >= max_vol * 0.90:  # 90% full - very high priority
+                    priority = 95
+                elif level >= threshold * 0.95:  # Near threshold - high priority
+                    priority = 85
+                elif has_no_collections and level >= threshold * 0.80:
+                    priority = 75
+                elif collections_per_cauldron[cauldron_id] < 2 and level >= threshold:
+                    priority = 65
+                elif level >= threshold:
+                    # Collect if this cauldron has fewer than average
+                    avg = total_collections / max(1, collected_cauldron_count)
+                    if collections_per_cauldron[cauldron_id] < avg * 1.3:
+                        priority = 55
+                # Also trigger collections for cauldrons that haven't been collected in a while
+                elif collections_per_cauldron[cauldron_id] == 0 and level >= threshold * 0.70:
+                    priority = 45
+                
+                if priority > 0:
+                    candidates_for_collection.append((priority, cauldron_id, level))
+        
+        # Only the top 3 by priority can be picked (but also consider balance)
+        top3 = nlargest(3, candidates_for_collection)
+        
+        # Process top candidate, but try to balance
         # If we have many candidates, prefer ones with fewer collections
-        if len(candidates_for_collection) > 1:
+        if len(top3) > 1:
             # Check if top 3 have very different collection counts
-            top3 = candidates_for_collection[:3]
             top3_counts = [collections_per_cauldron[c[1]] for c in top3]
             min_count = min(top3_counts)
             
             # If there's a significant difference, prefer lower count
             if max(top3_counts) - min_count > 2:
                 # Re-sort top 3 by collection count (fewer = higher priority)
-                top3_sorted = sorted(top3, key=lambda x: (collections_per_cauldron[x[1]], -x[0]))
-                candidates_for_collection = top3_sorted + candidates_for_collection[3:]
-    
-    if candidates_for_collection:
-        priority, cauldron_id, level = candidates_for_collection[0]
-        if cauldron_id not in cauldrons_needing_collection:
-            max_vol = cauldrons[cauldron_id]['max_volume']
-            shift = get_witch_shift(current_time)
-            available_witches = witches_by_shift[shift]
-            
-            witch_id = None
-            for w in available_witches:
-                travel_to = get_travel_time('market_001', cauldron_id)
-                collection_duration = random.randint(55, 85)
-                travel_back = get_travel_time(cauldron_id, 'market_001')
+                top3.sort(key=lambda x: (collections_per_cauldron[x[1]], -x[0]))
+        
+        if top3:
+            priority, cauldron_id, level = top3[0]
+            if cauldron_id not in cauldrons_needing_collection:
+                shift = get_witch_shift(current_time)
+                available_witches = witches_by_shift[shift]
                 
-                departure = current_time
-                collection_start = current_time + timedelta(minutes=travel_to)
-                collection_end = collection_start + timedelta(minutes=collection_duration)
-                arrival_back = collection_end + timedelta(minutes=travel_back)
-                unload_complete = arrival_back + timedelta(minutes=UNLOAD_TIME)
+                idx = cauldron_index[cauldron_id]
+                max_vol = cauldron_max_volumes[idx]
+                fill_rate = cauldron_fill_rates[idx]
+                travel_to = cauldron_travel_to[idx]
+                travel_back = cauldron_travel_back[idx]
                 
-                if is_witch_available(w, departure, unload_complete, witch_schedules):
-                    witch_id = w
-                    
-                    # Calculate collection
-                    level_at_collection = level + (fill_rates[cauldron_id] * travel_to)
-                    level_at_collection = min(level_at_collection, max_vol)  # Cap at max
-                    
-                    collection_percentage = random.uniform(0.60, 0.75)
-                    amount_to_collect = min(level_at_collection * collection_percentage, MAX_CAPACITY_PER_WITCH)
-                    
-                    # Calculate net drain: amount collected is what we take, net drain in cauldron accounts for filling
-                    fill_during_collection = fill_rates[cauldron_id] * collection_duration
-                    # Net drain = amount collected (this is the net reduction after accounting for simultaneous filling)
-                    # If we collect X liters while Y liters fill in, net drain = X
-                    # But we need to ensure X > Y for a meaningful collection
-                    actual_drain = amount_to_collect
-                    
-                    # Ensure we're actually draining something meaningful
-                    if actual_drain <= fill_during_collection:
-                        # Not enough - increase collection to ensure net drain
-                        actual_drain = fill_during_collection + random.uniform(100, 300)
-                        amount_to_collect = actual_drain
-                    
-                    # Cap at available level
-                    actual_drain = min(actual_drain, level_at_collection)
-                    actual_drain = max(50, actual_drain)  # Minimum 50L
-                    
-                    # Schedule event
-                    schedule_event = {
-                        'departure_from_market': departure,
-                        'collection_start': collection_start,
-                        'collection_end': collection_end,
-                        'unload_complete': unload_complete,
-                        'cauldron_id': cauldron_id,
-                        'actual_drain': actual_drain,
-                        'witch_id': witch_id
-                    }
-                    witch_schedules[witch_id].append(schedule_event)
-                    
-                    # Add drain to pending - THIS WILL CAUSE LEVELS TO DROP
-                    # Note: actual_drain is the net amount (already accounts for filling)
-                    # We need to calculate drain rate that will achieve this net drain
-                    # Net drain = drain_rate * duration - fill_rate * duration
-                    # So: drain_rate = (actual_drain / duration) + fill_rate
-                    total_drain_needed = actual_drain + (fill_rates[cauldron_id] * collection_duration)
-                    
-                    pending_drains.append({
-                        'cauldron_id': cauldron_id,
-                        'start': collection_start,
-                        'end': collection_end,
-                        'drain_amount': total_drain_needed,  # Total amount to remove (including what fills during drain)
-                        'duration': collection_duration,
-                        'net_drain': actual_drain  # Net amount after accounting for filling
-                    })
-                    
-                    # Determine if suspicious (12% chance)
-                    is_suspicious = random.random() < 0.12
-                    reported_amount = actual_drain
-                    
-                    if is_suspicious:
-                        underreport_factor = random.uniform(0.75, 0.92)
-                        reported_amount = actual_drain * underreport_factor
+                witch_id = None
+                for w in available_witches:
+                    collection_duration = randint(55, 85)
                     
-                    # Create ticket
-                    ticket_counter += 1
-                    date_str = collection_start.strftime('%Y%m%d')
-                    ticket_id = f"TT_{date_str}_{ticket_counter:03d}"
+                    # Trips depart now; compare them in minutes since start
+                    departure_minute = minute
+                    unload_minute = minute + travel_to + collection_duration + travel_back + UNLOAD_TIME
+                    trips = witch_trips[witch_index[w]]
                     
-                    ticket = {
-                        'ticket_id': ticket_id,
-                        'cauldron_id': cauldron_id,
-                        'collection_start_timestamp': collection_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'collection_timestamp': collection_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'amount_collected': round(reported_amount, 2),
-                        'courier_id': witch_id,
-                        'status': 'completed',
-                        'notes': 'Sequential collection'
-                    }
-                    
-                    if is_suspicious:
-                        ticket['is_suspicious'] = True
-                        ticket['suspicious_type'] = 'underreported'
-                        ticket['_actual_amount_collected'] = round(actual_drain, 2)
-                    
-                    new_tickets.append(ticket)
-                    collections_per_cauldron[cauldron_id] += 1
-                    cauldrons_needing_collection[cauldron_id] = collection_end
-                    
-                    break
-    
-    # Remove completed collections from tracking
-    for cauldron_id in list(cauldrons_needing_collection.keys()):
-        if current_time >= cauldrons_needing_collection[cauldron_id]:
-            del cauldrons_needing_collection[cauldron_id]
-    
-    # Store this minute's data
-    new_historical_data.append({
-        'timestamp': current_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
-        'cauldron_levels': minute_levels.copy()
-    })
+                    if is_witch_available(trips, departure_minute, unload_minute):
+                        witch_id = w
+                        collection_start = current_time + timedelta(minutes=travel_to)
+                        collection_end = collection_start + timedelta(minutes=collection_duration)
+                        
+                        # Calculate collection
+                        level_at_collection = level + (fill_rate * travel_to)
+                        level_at_collection = min(level_at_collection, max_vol)  # Cap at max
+                        
+                        collection_percentage = uniform(0.60, 0.75)
+                        amount_to_collect = min(level_at_collection * collection_percentage, MAX_CAPACITY_PER_WITCH)
+                        
+                        # Calculate net drain: amount collected is what we take, net drain in cauldron accounts for filling
+                        fill_during_collection = fill_rate * collection_duration
+                        # Net drain = amount collected (this is the net reduction after accounting for simultaneous filling)
+                        # If we collect X liters while Y liters fill in, net drain = X
+                        # But we need to ensure X > Y for a meaningful collection
+                        actual_drain = amount_to_collect
+                        
+                        # Ensure we're actually draining something meaningful
+                        if actual_drain <= fill_during_collection:
+                            # Not enough - increase collection to ensure net drain
+                            actual_drain = fill_during_collection + uniform(100, 300)
+                            amount_to_collect = actual_drain
+                        
+                        # Cap at available level
+                        actual_drain = min(actual_drain, level_at_collection)
+                        actual_drain = max(50, actual_drain)  # Minimum 50L
+                        
+                        # Schedule event
+                        insort(trips, (departure_minute, unload_minute))
+                        
+                        # Add drain to pending - THIS WILL CAUSE LEVELS TO DROP
+                        # Note: actual_drain is the net amount (already accounts for filling)
+                        # We need to calculate drain rate that will achieve this net drain
+                        # Net drain = drain_rate * duration - fill_rate * duration
+                        # So: drain_rate = (actual_drain / duration) + fill_rate
+                        total_drain_needed = actual_drain + (fill_rate * collection_duration)
+                        
+                        pending_drains.append(PendingDrain(
+                            cauldron_idx=idx,
+                            start_minute=minute + travel_to,
+                            end_minute=minute + travel_to + collection_duration,
+                            drain_amount=total_drain_needed,  # Total amount to remove (including what fills during drain)
+                            duration=collection_duration,
+                            net_drain=actual_drain  # Net amount after accounting for filling
+                        ))
+                        
+                        # Determine if suspicious (12% chance)
+                        is_suspicious = rand() < 0.12
+                        reported_amount = actual_drain
+                        
+                        if is_suspicious:
+                            underreport_factor = uniform(0.75, 0.92)
+                            reported_amount = actual_drain * underreport_factor
+                        
+                        # Create ticket
+                        ticket_counter += 1
+                        collection_start_timestamp = format_timestamp(collection_start)
+                        date_str = collection_start_timestamp[:10].replace('-', '')  # YYYYMMDD
+                        ticket_id = f"TT_{date_str}_{ticket_counter:03d}"
+                        
+                        ticket = {
+                            'ticket_id': ticket_id,
+                            'cauldron_id': cauldron_id,
+                            'collection_start_timestamp': collection_start_timestamp,
+                            'collection_timestamp': format_timestamp(collection_end),
+                            'amount_collected': round(reported_amount, 2),
+                            'courier_id': witch_id,
+                            'status': 'completed',
+                            'notes': 'Sequential collection'
+                        }
+                        
+                        if is_suspicious:
+                            ticket['is_suspicious'] = True
+                            ticket['suspicious_type'] = 'underreported'
+                            ticket['_actual_amount_collected'] = round(actual_drain, 2)
+                        
+                        new_tickets.append(ticket)
+                        if collections_per_cauldron[cauldron_id] == 0:
+                            collected_cauldron_count += 1
+                        collections_per_cauldron[cauldron_id] += 1
+                        total_collections += 1
+                        cauldrons_needing_collection[cauldron_id] = collection_end
+                        
+                        break
+        
+        # Remove completed collections from tracking
+        for cauldron_id in list(cauldrons_needing_collection.keys()):
+            if current_time >= cauldrons_needing_collection[cauldron_id]:
+                del cauldrons_needing_collection[cauldron_id]
+        
+        # Store this minute's data
+        new_timestamps.append(format_timestamp(current_time))
+        new_level_rows.append(minute_levels)
+        
+        current_time += timedelta(minutes=1)
+        minute += 1
     
-    current_time += timedelta(minutes=1)
+    return new_timestamps, new_level_rows, new_tickets, collections_per_cauldron
+
+sim_rng = random.Random(78901)  # Dedicated seeded generator for reproducibility
+new_timestamps, new_level_rows, new_tickets, collections_per_cauldron = simulate(
+    new_start, new_end, current_levels, ticket_counter, sim_rng)
 
 # Add unreported drains (3-4 instances)
 print("\nAdding unreported drains...")
-random.seed(23456)
+drain_rng = random.Random(23456)
 
 selected_drains = []
 candidate_times = [
@@ -343,20 +355,18 @@ candidate_times = [
 for drain_start in candidate_times:
     # Find level at this time
     level_at_time = None
-    for entry in new_historical_data:
-        ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-        if abs((ts - drain_start).total_seconds()) < 60:
-            level_at_time = entry['cauldron_levels']
-            break
+    idx = get_minute_index(drain_start)
+    if 0 <= idx < len(new_level_rows):
+        level_at_time = new_level_rows[idx]
     
     if level_at_time:
-        candidates = [(cid, lvl) for cid, lvl in level_at_time.items() if lvl > 200]
+        candidates = [(cid, lvl) for cid, lvl in zip(cauldron_ids, level_at_time) if lvl > 200]
         if candidates:
-            cauldron_id, level = random.choice(candidates)
-            drain_duration = random.randint(60, 80)
+            cauldron_id, level = drain_rng.choice(candidates)
+            drain_duration = drain_rng.randint(60, 80)
             drain_end = drain_start + timedelta(minutes=drain_duration)
             
-            drain_amount = min(random.uniform(200, 400), level * 0.55)
+            drain_amount = min(drain_rng.uniform(200, 400), level * 0.55)
             
             selected_drains.append({
                 'cauldron_id': cauldron_id,
@@ -371,18 +381,20 @@ for drain_start in candidate_times:
 for drain in selected_drains:
     drain_rate_per_min = drain['drain_amount'] / drain['duration']
     net_drain_per_min = drain_rate_per_min - drain['fill_rate']
+    i = cauldron_index[drain['cauldron_id']]
     
-    for entry in new_historical_data:
-        ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-        if drain['drain_start'] <= ts <= drain['drain_end']:
-            if net_drain_per_min > 0:
-                current_level = entry['cauldron_levels'].get(drain['cauldron_id'], 0)
-                entry['cauldron_levels'][drain['cauldron_id']] = max(0, round(current_level - net_drain_per_min, 2))
+    # Only the minutes between drain start and end (inclusive) are affected
+    start_idx = max(get_minute_index(drain['drain_start']), 0)
+    end_idx = min(get_minute_index(drain['drain_end']), len(new_level_rows) - 1)
+    if net_drain_per_min > 0:
+        for idx in range(start_idx, end_idx + 1):
+            row = new_level_rows[idx]
+            row[i] = max(0, row[i] - net_drain_per_min)
     
     new_unreported_drains.append({
         'cauldron_id': drain['cauldron_id'],
-        'drain_start_timestamp': drain['drain_start'].strftime('%Y-%m-%dT%H:%M:%SZ'),
-        'drain_end_timestamp': drain['drain_end'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'drain_start_timestamp': format_timestamp(drain['drain_start']),
+        'drain_end_timestamp': format_timestamp(drain['drain_end']),
         'estimated_amount_drained_liters': round(drain['drain_amount'], 2),
         'duration_minutes': drain['duration'],
         'note': 'NO TICKET EXISTS - this is an unreported drain'
@@ -390,8 +402,11 @@ for drain in selected_drains:
 
 # Merge data
 print("\nMerging data...")
-hist['data'].extend(new_historical_data)
-hist['metadata']['end_date'] = new_end.strftime('%Y-%m-%dT%H:%M:%SZ')
+hist['data'].extend(
+    {'timestamp': timestamp, 'cauldron_levels': {cid: round(level, 2) for cid, level in zip(cauldron_ids, row)}}
+    for timestamp, row in zip(new_timestamps, new_level_rows)
+)
+hist['metadata']['end_date'] = format_timestamp(new_end)
 hist['metadata']['total_minutes'] = len(hist['data'])
 hist['metadata']['total_collections'] = len(tickets_data['transport_tickets']) + len(new_tickets)
 
@@ -401,17 +416,12 @@ unreported_data['metadata']['total_unreported_drains'] = len(unreported_data['un
 
 # Save
 print("\nSaving files...")
-with open('historical_data.json', 'w') as f:
-    json.dump(hist, f, indent=2)
-
-with open('transport_tickets.json', 'w') as f:
-    json.dump(tickets_data, f, indent=2)
-
-with open('unreported_drains.json', 'w') as f:
-    json.dump(unreported_data, f, indent=2)
+save_json('historical_data.json', hist)
+save_json('transport_tickets.json', tickets_data)
+save_json('unreported_drains.json', unreported_data)
 
 print(f"\n✅ Extended data to Nov 9!")
-print(f"   Added {len(new_historical_data)} minutes of data")
+print(f"   Added {len(new_level_rows)} minutes of data")
 print(f"   Added {len(new_tickets)} tickets")
 print(f"   Added {len(new_unreported_drains)} unreported drains")
 suspicious = sum(1 for t in new_tickets if t.get('is_suspicious'))
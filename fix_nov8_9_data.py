@@ -7,41 +7,28 @@ Properly regenerate Nov 8-9 data with:
 - Proper unreported drains
 """
 
-import json
 import random
 from datetime import datetime, timedelta, timezone
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+
+from data_utils import (load_json, save_json, build_travel_times, format_timestamp,
+                        load_historical_tail, save_historical_data)
 
 # Load data
 print("Loading data...")
-with open('historical_data.json', 'r') as f:
-    hist = json.load(f)
-
-with open('cauldrons.json', 'r') as f:
-    cauldrons_data = json.load(f)
-
-with open('transport_tickets.json', 'r') as f:
-    tickets_data = json.load(f)
-
-with open('unreported_drains.json', 'r') as f:
-    unreported_data = json.load(f)
+historical_metadata, last_entry, existing_historical_entries, existing_pretty, existing_minutes = (
+    load_historical_tail('historical_data.json'))
+cauldrons_data = load_json('cauldrons.json')
+tickets_data = load_json('transport_tickets.json')
+unreported_data = load_json('unreported_drains.json')
 
 # Extract data
 cauldrons = {c['id']: c for c in cauldrons_data['cauldrons']}
 network_edges = cauldrons_data['network']['edges']
 couriers = cauldrons_data['couriers']
 
-# Build travel times
-travel_times = {}
-for edge in network_edges:
-    key = (edge['from'], edge['to'])
-    travel_times[key] = edge['travel_time_minutes']
-    travel_times[(edge['to'], edge['from'])] = edge['travel_time_minutes']
-
-def get_travel_time(from_id, to_id):
-    if from_id == to_id:
-        return 0
-    return travel_times.get((from_id, to_id), 30)
+# Travel times between locations (default 30 min if not found)
+get_travel_time = build_travel_times(cauldrons, network_edges)
 
 # Fill rates (from original data)
 fill_rates = {
@@ -78,19 +65,23 @@ def get_witch_shift(timestamp):
     else:
         return 3
 
-def is_witch_available(witch_id, start_time, end_time, witch_schedules):
-    if witch_id not in witch_schedules:
-        return True
-    for event in witch_schedules[witch_id]:
-        event_start = event.get('departure_from_market') or event.get('collection_start')
-        event_end = event.get('unload_complete') or event.get('collection_end')
-        if event_start and event_end:
-            if not (end_time <= event_start or start_time >= event_end):
-                return False
-    return True
+# A scheduled collection drain, in minutes since the simulation start
+PendingDrain = namedtuple('PendingDrain', 'cauldron_idx start_minute end_minute net_drain')
+
+def fill_levels(levels, rates, max_volumes, uniform):
+    """Apply one minute of filling to every cauldron level in place"""
+    # Each cauldron only depends on its own level, so the row is rebuilt in one comprehension
+    # Apply noise: 97% to 105% of fill rate (3-5% variation)
+    levels[:] = [min(level + fill_rate * uniform(0.97, 1.05), max_vol)
+                 for level, fill_rate, max_vol in zip(levels, rates, max_volumes)]
+
+def is_witch_available(witch_id, start_minute, witch_next_free):
+    # Trips are scheduled in chronological order and depart immediately, so a
+    # witch is free once her latest trip has been unloaded
+    next_free = witch_next_free.get(witch_id)
+    return next_free is None or next_free <= start_minute
 
 # Get last entry
-last_entry = hist['data'][-1]
 last_timestamp = datetime.fromisoformat(last_entry['timestamp'].replace('Z', '+00:00'))
 initial_levels = {k: v for k, v in last_entry['cauldron_levels'].items()}
 
@@ -101,192 +92,215 @@ print(f"Initial levels: {initial_levels}")
 new_start = last_timestamp + timedelta(minutes=1)
 new_end = new_start + timedelta(days=2) - timedelta(minutes=1)
 
+def get_minute_index(timestamp):
+    # Generated minutes are one minute apart starting at new_start
+    return int((timestamp - new_start).total_seconds() // 60)
+
 print(f"\nGenerating Nov 8-9 data from {new_start} to {new_end}")
 
 # Initialize
-new_historical_data = []
-new_tickets = []
 new_unreported_drains = []
-witch_schedules = defaultdict(list)
 ticket_counter = max([int(t['ticket_id'].split('_')[-1]) for t in tickets_data['transport_tickets']], default=0)
 
-current_levels = {k: v for k, v in initial_levels.items()}
-pending_drains = []  # Active drains
-cauldrons_needing_collection = {}  # Track which cauldrons need collection
+# Track levels as parallel lists indexed by cauldron position so the
+# per-minute fill works on plain lists instead of nested dict lookups
+cauldron_ids = list(initial_levels.keys())
+cauldron_index = {cauldron_id: i for i, cauldron_id in enumerate(cauldron_ids)}
+cauldron_max_volumes = [cauldrons[cauldron_id]['max_volume'] for cauldron_id in cauldron_ids]
+cauldron_fill_rates = [fill_rates[cauldron_id] for cauldron_id in cauldron_ids]
+current_levels = [initial_levels[cauldron_id] for cauldron_id in cauldron_ids]
+
+# Per-cauldron constants, hoisted out of the minute loop
+cauldron_threshold_levels = [collection_thresholds[cauldron_id] * max_vol
+                             for cauldron_id, max_vol in zip(cauldron_ids, cauldron_max_volumes)]
+cauldron_capacity_levels = [max_vol * 0.99 for max_vol in cauldron_max_volumes]
+cauldron_travel_to = [get_travel_time('market_001', cauldron_id) for cauldron_id in cauldron_ids]
+cauldron_travel_back = [get_travel_time(cauldron_id, 'market_001') for cauldron_id in cauldron_ids]
 
-# Track collections per cauldron to ensure balance
-collections_per_cauldron = defaultdict(int)
 target_collections_per_cauldron = 3  # Aim for ~3 collections per cauldron over 2 days
 
-current_time = new_start
-random.seed(12345)  # For reproducibility with noise
-
-while current_time <= new_end:
-    # Apply any active drains first
-    minute_levels = current_levels.copy()
+def simulate(start, end, current_levels, ticket_counter, rng):
+    """Generate minute-by-minute levels and collection tickets from start to end"""
+    uniform, randint, rand = rng.uniform, rng.randint, rng.random
+    # Each minute is stored as a timestamp and a row of levels in cauldron_ids order;
+    # the per-minute dicts are only built when the data is merged
+    new_timestamps = []
+    new_level_rows = []
+    new_tickets = []
+    witch_next_free = {}  # Witch ID -> minute her latest trip is unloaded
+    pending_drains = []  # Active drains
+    # By cauldron index: end minute of the collection in progress, or None if not being collected
+    collection_end_minutes = [None] * len(cauldron_ids)
     
-    for drain in list(pending_drains):
-        if drain['start'] <= current_time <= drain['end']:
-            # Apply drain
-            drain_rate = drain['drain_amount'] / drain['duration']
-            net_drain = drain_rate - fill_rates[drain['cauldron_id']]
-            if net_drain > 0:
-                minute_levels[drain['cauldron_id']] = max(0, minute_levels[drain['cauldron_id']] - net_drain)
-                current_levels[drain['cauldron_id']] = minute_levels[drain['cauldron_id']]
-        
-        # Remove completed drains
-        if current_time > drain['end']:
-            pending_drains.remove(drain)
+    # Track collections per cauldron (by cauldron index) to ensure balance
+    collection_counts = [0] * len(cauldron_ids)
+    # Running totals for the average collections per collected cauldron
+    total_collections = 0
+    collected_cauldron_count = 0
     
-    # Update levels with filling (WITH NOISE - 3-5% variation)
-    for cauldron_id, current_level in minute_levels.items():
-        max_vol = cauldrons[cauldron_id]['max_volume']
-        fill_rate = fill_rates[cauldron_id]
+    current_time = start
+    minute = 0  # Minutes since start, used for integer scheduling bookkeeping
+    while current_time <= end:
+        # Apply any active drains first
+        j = 0
+        while j < len(pending_drains):
+            drain = pending_drains[j]
+            if drain.start_minute <= minute <= drain.end_minute:
+                # Apply drain
+                if drain.net_drain > 0:
+                    i = drain.cauldron_idx
+                    current_levels[i] = max(0, current_levels[i] - drain.net_drain)
+            
+            # Remove completed drains by moving the last drain into their slot
+            if minute > drain.end_minute:
+                pending_drains[j] = pending_drains[-1]
+                pending_drains.pop()
+            else:
+                j += 1
         
-        # Apply noise: 97% to 105% of fill rate (3-5% variation)
-        noise_factor = random.uniform(0.97, 1.05)
-        fill_amount = fill_rate * noise_factor
+        # Update levels with filling (WITH NOISE - 3-5% variation)
+        fill_levels(current_levels, cauldron_fill_rates, cauldron_max_volumes, uniform)
+        minute_levels = [round(level, 2) for level in current_levels]
         
-        new_level = min(current_level + fill_amount, max_vol)
-        minute_levels[cauldron_id] = round(new_level, 2)
-        current_levels[cauldron_id] = new_level
-    
-    # Check for collections needed - ENSURE BALANCED DISTRIBUTION
-    # First, check if any cauldron needs its first collection (prioritize these)
-    candidates_for_collection = []
-    
-    for cauldron_id, level in minute_levels.items():
-        max_vol = cauldrons[cauldron_id]['max_volume']
-        threshold = collection_thresholds[cauldron_id] * max_vol
-        at_capacity = level >= max_vol * 0.99
-        has_no_collections = collections_per_cauldron[cauldron_id] == 0
-        needs_more = collections_per_cauldron[cauldron_id] < target_collections_per_cauldron
+        # Check for collections needed - ENSURE BALANCED DISTRIBUTION
+        # First, check if any cauldron needs its first collection (prioritize these)
+        candidates_for_collection = []
+        avg_collections = total_collections / max(1, collected_cauldron_count)  # Constant within a minute
         
-        if cauldron_id not in cauldrons_needing_collection:
-            # Prioritize: at capacity > no collections > needs more > others
-            priority = 0
-            if at_capacity:
-                priority = 100
-            elif has_no_collections and level >= threshold * 0.85:  # Collect earlier if no collections yet
-                priority = 80
-            elif needs_more and level >= threshold:
-                priority = 50
-            elif level >= threshold:
-                # Collect if this cauldron has fewer collections than average
-                avg_collections = sum(collections_per_cauldron.values()) / max(1, len([c for c in collections_per_cauldron.values() if c > 0]))
-                if collections_per_cauldron[cauldron_id] < avg_collections * 1.5:
-                    priority = 30
+        for i, (cauldron_id, level) in enumerate(zip(cauldron_ids, minute_levels)):
+            threshold = cauldron_threshold_levels[i]
+            at_capacity = level >= cauldron_capacity_levels[i]
+            collection_count = collection_counts[i]
+            has_no_collections = collection_count == 0
+            needs_more = collection_count < target_collections_per_cauldron
             
-            if priority > 0:
-                candidates_for_collection.append((priority, cauldron_id, level))
-    
-    # Sort by priority (highest first)
-    candidates_for_collection.sort(reverse=True)
-    
-    # Process top candidate
-    if candidates_for_collection:
-        priority, cauldron_id, level = candidates_for_collection[0]
-        if cauldron_id not in cauldrons_needing_collection:
-            max_vol = cauldrons[cauldron_id]['max_volume']
-            shift = get_witch_shift(current_time)
-            available_witches = witches_by_shift[shift]
-            
-            witch_id = None
-            for w in available_witches:
-                travel_to = get_travel_time('market_001', cauldron_id)
-                collection_duration = random.randint(55, 85)
-                travel_back = get_travel_time(cauldron_id, 'market_001')
+            if collection_end_minutes[i] is None:
+                # Prioritize: at capacity > no collections > needs more > others
+                priority = 0
+                if at_capacity:
+                    priority = 100
+                elif has_no_collections and level >= threshold * 0.85:  # Collect earlier if no collections yet
+                    priority = 80
+                elif needs_more and level >= threshold:
+                    priority = 50
+                elif level >= threshold:
+                    # Collect if this cauldron has fewer collections than average
+                    if collection_count < avg_collections * 1.5:
+                        priority = 30
                 
-                departure = current_time
-                collection_start = current_time + timedelta(minutes=travel_to)
-                collection_end = collection_start + timedelta(minutes=collection_duration)
-                arrival_back = collection_end + timedelta(minutes=travel_back)
-                unload_complete = arrival_back + timedelta(minutes=UNLOAD_TIME)
+                if priority > 0:
+                    candidates_for_collection.append((priority, cauldron_id, level))
+        
+        # Sort by priority (highest first)
+        candidates_for_collection.sort(reverse=True)
+        
+        # Process top candidate
+        if candidates_for_collection:
+            priority, cauldron_id, level = candidates_for_collection[0]
+            idx = cauldron_index[cauldron_id]
+            if collection_end_minutes[idx] is None:
+                shift = get_witch_shift(current_time)
+                available_witches = witches_by_shift[shift]
                 
-                if is_witch_available(w, departure, unload_complete, witch_schedules):
-                    witch_id = w
-                    
-                    # Calculate collection
-                    level_at_collection = level + (fill_rates[cauldron_id] * travel_to)
-                    collection_percentage = random.uniform(0.60, 0.75)
-                    amount_to_collect = min(level_at_collection * collection_percentage, MAX_CAPACITY_PER_WITCH)
-                    
-                    fill_during_collection = fill_rates[cauldron_id] * collection_duration
-                    actual_drain = amount_to_collect - fill_during_collection
-                    actual_drain = max(0, min(actual_drain, level_at_collection))
-                    
-                    # Schedule event
-                    schedule_event = {
-                        'departure_from_market': departure,
-                        'collection_start': collection_start,
-                        'collection_end': collection_end,
-                        'unload_complete': unload_complete,
-                        'cauldron_id': cauldron_id,
-                        'actual_drain': actual_drain,
-                        'witch_id': witch_id
-                    }
-                    witch_schedules[witch_id].append(schedule_event)
-                    
-                    # Add drain to pending
-                    pending_drains.append({
-                        'cauldron_id': cauldron_id,
-                        'start': collection_start,
-                        'end': collection_end,
-                        'drain_amount': actual_drain,
-                        'duration': collection_duration
-                    })
-                    
-                    # Determine if suspicious
-                    is_suspicious = random.random() < 0.12
-                    reported_amount = actual_drain
-                    
-                    if is_suspicious:
-                        underreport_factor = random.uniform(0.75, 0.92)
-                        reported_amount = actual_drain * underreport_factor
-                    
-                    # Create ticket
-                    ticket_counter += 1
-                    date_str = collection_start.strftime('%Y%m%d')
-                    ticket_id = f"TT_{date_str}_{ticket_counter:03d}"
-                    
-                    ticket = {
-                        'ticket_id': ticket_id,
-                        'cauldron_id': cauldron_id,
-                        'collection_start_timestamp': collection_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'collection_timestamp': collection_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'amount_collected': round(reported_amount, 2),
-                        'courier_id': witch_id,
-                        'status': 'completed',
-                        'notes': 'Sequential collection'
-                    }
-                    
-                    if is_suspicious:
-                        ticket['is_suspicious'] = True
-                        ticket['suspicious_type'] = 'underreported'
-                        ticket['_actual_amount_collected'] = round(actual_drain, 2)
+                fill_rate = cauldron_fill_rates[idx]
+                travel_to = cauldron_travel_to[idx]
+                travel_back = cauldron_travel_back[idx]
+                
+                witch_id = None
+                for w in available_witches:
+                    collection_duration = randint(55, 85)
                     
-                    new_tickets.append(ticket)
-                    collections_per_cauldron[cauldron_id] += 1
-                    cauldrons_needing_collection[cauldron_id] = collection_end
+                    # Trip times as minutes since start - no datetime arithmetic per witch
+                    start_minute = minute + travel_to
+                    end_minute = start_minute + collection_duration
+                    unload_minute = end_minute + travel_back + UNLOAD_TIME
                     
-                    break
-    
-    # Remove completed collections from tracking
-    for cauldron_id in list(cauldrons_needing_collection.keys()):
-        if current_time >= cauldrons_needing_collection[cauldron_id]:
-            del cauldrons_needing_collection[cauldron_id]
-    
-    # Store this minute's data
-    new_historical_data.append({
-        'timestamp': current_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
-        'cauldron_levels': minute_levels.copy()
-    })
+                    if is_witch_available(w, minute, witch_next_free):
+                        witch_id = w
+                        collection_start = current_time + timedelta(minutes=travel_to)
+                        collection_end = collection_start + timedelta(minutes=collection_duration)
+                        
+                        # Calculate collection
+                        level_at_collection = level + (fill_rate * travel_to)
+                        collection_percentage = uniform(0.60, 0.75)
+                        amount_to_collect = min(level_at_collection * collection_percentage, MAX_CAPACITY_PER_WITCH)
+                        
+                        fill_during_collection = fill_rate * collection_duration
+                        actual_drain = amount_to_collect - fill_during_collection
+                        actual_drain = max(0, min(actual_drain, level_at_collection))
+                        
+                        # Schedule event
+                        witch_next_free[witch_id] = unload_minute
+                        
+                        # Add drain to pending
+                        pending_drains.append(PendingDrain(
+                            cauldron_idx=idx,
+                            start_minute=start_minute,
+                            end_minute=end_minute,
+                            net_drain=actual_drain / collection_duration - fill_rate
+                        ))
+                        
+                        # Determine if suspicious
+                        is_suspicious = rand() < 0.12
+                        reported_amount = actual_drain
+                        
+                        if is_suspicious:
+                            underreport_factor = uniform(0.75, 0.92)
+                            reported_amount = actual_drain * underreport_factor
+                        
+                        # Create ticket
+                        ticket_counter += 1
+                        collection_start_timestamp = format_timestamp(collection_start)
+                        date_str = collection_start_timestamp[:10].replace('-', '')
+                        ticket_id = f"TT_{date_str}_{ticket_counter:03d}"
+                        
+                        ticket = {
+                            'ticket_id': ticket_id,
+                            'cauldron_id': cauldron_id,
+                            'collection_start_timestamp': collection_start_timestamp,
+                            'collection_timestamp': format_timestamp(collection_end),
+                            'amount_collected': round(reported_amount, 2),
+                            'courier_id': witch_id,
+                            'status': 'completed',
+                            'notes': 'Sequential collection'
+                        }
+                        
+                        if is_suspicious:
+                            ticket['is_suspicious'] = True
+                            ticket['suspicious_type'] = 'underreported'
+                            ticket['_actual_amount_collected'] = round(actual_drain, 2)
+                        
+                        new_tickets.append(ticket)
+                        if collection_counts[idx] == 0:
+                            collected_cauldron_count += 1
+                        collection_counts[idx] += 1
+                        total_collections += 1
+                        collection_end_minutes[idx] = end_minute
+                        
+                        break
+        
+        # Remove completed collections from tracking
+        for i, end_minute in enumerate(collection_end_minutes):
+            if end_minute is not None and minute >= end_minute:
+                collection_end_minutes[i] = None
+        
+        # Store this minute's data
+        new_timestamps.append(format_timestamp(current_time))
+        new_level_rows.append(minute_levels)
+        
+        current_time += timedelta(minutes=1)
+        minute += 1
     
-    current_time += timedelta(minutes=1)
+    collections_per_cauldron = dict(zip(cauldron_ids, collection_counts))
+    return new_timestamps, new_level_rows, new_tickets, collections_per_cauldron
+
+sim_rng = random.Random(12345)  # Dedicated seeded generator for reproducibility
+new_timestamps, new_level_rows, new_tickets, collections_per_cauldron = simulate(
+    new_start, new_end, current_levels, ticket_counter, sim_rng)
 
 # Add unreported drains (3-4 instances)
 print("\nAdding unreported drains...")
-random.seed(54321)
+drain_rng = random.Random(54321)
 
 # Find good spots for unreported drains
 selected_drains = []
@@ -300,25 +314,25 @@ candidate_times = [
 for drain_start in candidate_times:
     # Find level at this time
     level_at_time = None
-    for entry in new_historical_data:
-        ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-        if abs((ts - drain_start).total_seconds()) < 60:
-            level_at_time = entry['cauldron_levels']
-            break
+    idx = get_minute_index(drain_start)
+    if 0 <= idx < len(new_level_rows):
+        level_at_time = new_level_rows[idx]
     
     if level_at_time:
-        candidates = [(cid, lvl) for cid, lvl in level_at_time.items() if lvl > 200]
+        candidates = [(cid, lvl) for cid, lvl in zip(cauldron_ids, level_at_time) if lvl > 200]
         if candidates:
-            cauldron_id, level = random.choice(candidates)
-            drain_duration = random.randint(60, 75)
+            cauldron_id, level = drain_rng.choice(candidates)
+            drain_duration = drain_rng.randint(60, 75)
             drain_end = drain_start + timedelta(minutes=drain_duration)
             
-            drain_amount = min(random.uniform(200, 350), level * 0.55)
+            drain_amount = min(drain_rng.uniform(200, 350), level * 0.55)
             
             selected_drains.append({
                 'cauldron_id': cauldron_id,
                 'drain_start': drain_start,
                 'drain_end': drain_end,
+                'start_idx': idx,  # History indices, resolved once here
+                'end_idx': idx + drain_duration,
                 'drain_amount': drain_amount,
                 'duration': drain_duration,
                 'fill_rate': fill_rates[cauldron_id]
@@ -329,16 +343,17 @@ for drain in selected_drains:
     drain_rate_per_min = drain['drain_amount'] / drain['duration']
     net_drain_per_min = drain_rate_per_min - drain['fill_rate']
     
-    for entry in new_historical_data:
-        ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-        if drain['drain_start'] <= ts <= drain['drain_end']:
-            current_level = entry['cauldron_levels'].get(drain['cauldron_id'], 0)
-            entry['cauldron_levels'][drain['cauldron_id']] = max(0, round(current_level - net_drain_per_min, 2))
+    # Only the minutes between drain start and end (inclusive) are affected
+    start_idx = drain['start_idx']
+    end_idx = min(drain['end_idx'], len(new_level_rows) - 1)
+    i = cauldron_index[drain['cauldron_id']]
+    for row in new_level_rows[start_idx:end_idx + 1]:
+        row[i] = max(0, round(row[i] - net_drain_per_min, 2))
     
     new_unreported_drains.append({
         'cauldron_id': drain['cauldron_id'],
-        'drain_start_timestamp': drain['drain_start'].strftime('%Y-%m-%dT%H:%M:%SZ'),
-        'drain_end_timestamp': drain['drain_end'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'drain_start_timestamp': format_timestamp(drain['drain_start']),
+        'drain_end_timestamp': format_timestamp(drain['drain_end']),
         'estimated_amount_drained_liters': round(drain['drain_amount'], 2),
         'duration_minutes': drain['duration'],
         'note': 'NO TICKET EXISTS - this is an unreported drain'
@@ -346,10 +361,14 @@ for drain in selected_drains:
 
 # Merge data
 print("\nMerging data...")
-hist['data'].extend(new_historical_data)
-hist['metadata']['end_date'] = new_end.strftime('%Y-%m-%dT%H:%M:%SZ')
-hist['metadata']['total_minutes'] = len(hist['data'])
-hist['metadata']['total_collections'] = len(tickets_data['transport_tickets']) + len(new_tickets)
+# Existing minutes are never decoded - the new ones are streamed after them when saving
+new_historical_entries = (
+    {'timestamp': timestamp, 'cauldron_levels': dict(zip(cauldron_ids, row))}
+    for timestamp, row in zip(new_timestamps, new_level_rows)
+)
+historical_metadata['end_date'] = format_timestamp(new_end)
+historical_metadata['total_minutes'] = existing_minutes + len(new_timestamps)
+historical_metadata['total_collections'] = len(tickets_data['transport_tickets']) + len(new_tickets)
 
 tickets_data['transport_tickets'].extend(new_tickets)
 unreported_data['unreported_drains'].extend(new_unreported_drains)
@@ -357,17 +376,13 @@ unreported_data['metadata']['total_unreported_drains'] = len(unreported_data['un
 
 # Save
 print("\nSaving files...")
-with open('historical_data.json', 'w') as f:
-    json.dump(hist, f, indent=2)
-
-with open('transport_tickets.json', 'w') as f:
-    json.dump(tickets_data, f, indent=2)
-
-with open('unreported_drains.json', 'w') as f:
-    json.dump(unreported_data, f, indent=2)
+save_historical_data('historical_data.json', historical_metadata, existing_historical_entries,
+                     new_historical_entries, existing_pretty=existing_pretty)
+save_json('transport_tickets.json', tickets_data)
+save_json('unreported_drains.json', unreported_data)
 
 print(f"\n✅ Regenerated Nov 8-9 data!")
-print(f"   Added {len(new_historical_data)} minutes of data")
+print(f"   Added {len(new_timestamps)} minutes of data")
 print(f"   Added {len(new_tickets)} tickets")
 print(f"   Added {len(new_unreported_drains)} unreported drains")
 print(f"\nTicket distribution:")
@@ -10,38 +10,35 @@ Optimize witch assignments:
    - No double-booking (witches can't be in two places at once)
 """
 
-import json
-from datetime import datetime, timedelta
-from collections import defaultdict
+import heapq
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict, namedtuple
+from operator import itemgetter
+
+from data_utils import load_json, save_json, build_travel_times, format_timestamp
 
 # Load data
 print("Loading data...")
-with open('cauldrons.json', 'r') as f:
-    cauldrons_data = json.load(f)
-
-with open('transport_tickets.json', 'r') as f:
-    tickets_data = json.load(f)
+cauldrons_data = load_json('cauldrons.json')
+tickets_data = load_json('transport_tickets.json')
 
 cauldrons = {c['id']: c for c in cauldrons_data['cauldrons']}
 network_edges = cauldrons_data['network']['edges']
 tickets = tickets_data['transport_tickets']
 
-# Build travel time lookup
-travel_times = {}
-for edge in network_edges:
-    key = (edge['from'], edge['to'])
-    travel_times[key] = edge['travel_time_minutes']
-    travel_times[(edge['to'], edge['from'])] = edge['travel_time_minutes']
+# Travel times between locations (default 30 min if not found)
+get_travel_time = build_travel_times(cauldrons, network_edges)
 
-def get_travel_time(from_id, to_id):
-    """Get travel time between two locations"""
-    if from_id == to_id:
-        return 0
-    return travel_times.get((from_id, to_id), 30)  # Default 30 min if not found
+# Witches start every trip at the market and unload there afterwards,
+# so both legs only depend on the cauldron
+market_to_cauldron = {cauldron_id: get_travel_time('market_001', cauldron_id) for cauldron_id in cauldrons}
+cauldron_to_market = {cauldron_id: get_travel_time(cauldron_id, 'market_001') for cauldron_id in cauldrons}
 
 # Constants
 UNLOAD_TIME = 15  # Minutes to unload at market
 MIN_BUFFER = 5  # Minimum buffer between tasks (minutes)
+UNLOAD_DELTA = timedelta(minutes=UNLOAD_TIME)  # Built once rather than per ticket
+MIN_BUFFER_DELTA = timedelta(minutes=MIN_BUFFER)
 
 # Parse tickets
 ticket_events = []
@@ -49,64 +46,67 @@ for ticket in tickets:
     start = datetime.fromisoformat(ticket['collection_start_timestamp'].replace('Z', '+00:00'))
     end = datetime.fromisoformat(ticket['collection_timestamp'].replace('Z', '+00:00'))
     collection_duration = (end - start).total_seconds() / 60
+    cauldron_id = ticket['cauldron_id']
     
     ticket_events.append({
         'ticket_id': ticket['ticket_id'],
-        'cauldron_id': ticket['cauldron_id'],
+        'cauldron_id': cauldron_id,
+        'travel_to_cauldron': market_to_cauldron.get(cauldron_id, 30),  # Default 30 min if not found
+        'travel_to_market': cauldron_to_market.get(cauldron_id, 30),
         'start': start,
         'end': end,
         'collection_duration': collection_duration,
         'amount': ticket.get('amount_collected', 0),
         'is_suspicious': ticket.get('is_suspicious', False),
-        'suspicious_type': ticket.get('suspicious_type')
+        'suspicious_type': ticket.get('suspicious_type'),
+        'sort_key': int(start.timestamp())  # Integer compares sort faster than datetimes
     })
 
 # Sort by start time
-ticket_events.sort(key=lambda x: x['start'])
+ticket_events.sort(key=itemgetter('sort_key'))
 
 print(f"\nTotal tickets: {len(ticket_events)}")
 print(f"Date range: {ticket_events[0]['start'].date()} to {ticket_events[-1]['start'].date()}")
 
 # Optimize witch assignments
-# Each witch has a schedule: list of (end_time, location, ticket_id)
-# location is either a cauldron_id or 'market_001'
+# Each witch has a schedule: list of ScheduleEntry, one per ticket
+ScheduleEntry = namedtuple('ScheduleEntry', 'arrival_at_cauldron collection_start collection_end '
+                                            'travel_to_market_end unload_end cauldron_id ticket_id')
 
 class Witch:
     def __init__(self, witch_id):
         self.witch_id = witch_id
-        self.schedule = []  # List of (arrival_at_cauldron, collection_start, collection_end, 
-                            #         travel_to_market_end, unload_end, cauldron_id, ticket_id)
+        self.schedule = []  # List of ScheduleEntry
         self.current_location = 'market_001'  # Start at market
-        self.last_available_time = None  # When witch becomes available for next task
+        self.last_available_time = None  # When witch becomes available for next task (last unload end)
     
-    def can_handle_ticket(self, ticket, travel_times_func):
+    def can_handle_ticket(self, ticket):
         """Check if this witch can handle the ticket, accounting for all constraints"""
         if not self.schedule:
             # Witch is free, can handle it
             return True
         
         # Get last task end time
-        last_unload_end = self.schedule[-1][4]  # unload_end time
-        current_loc = self.schedule[-1][5]  # last cauldron_id
+        last_unload_end = self.last_available_time
         
         # Calculate: travel from current location (or market if just unloaded) to ticket cauldron
         # After unloading, witch is at market
-        travel_to_cauldron = travel_times_func('market_001', ticket['cauldron_id'])
+        travel_to_cauldron = ticket['travel_to_cauldron']
         
         # When can witch arrive at cauldron?
         earliest_arrival = last_unload_end + timedelta(minutes=travel_to_cauldron)
         
         # Can witch arrive before or at ticket start time?
         # Allow small buffer for timing flexibility
-        if earliest_arrival <= ticket['start'] + timedelta(minutes=MIN_BUFFER):
+        if earliest_arrival <= ticket['start'] + MIN_BUFFER_DELTA:
             return True
         
         return False
     
-    def assign_ticket(self, ticket, travel_times_func):
+    def assign_ticket(self, ticket):
         """Assign ticket to this witch, updating schedule with all times"""
-        travel_to_cauldron = travel_times_func('market_001', ticket['cauldron_id'])
-        travel_to_market = travel_times_func(ticket['cauldron_id'], 'market_001')
+        travel_to_cauldron = ticket['travel_to_cauldron']
+        travel_to_market = ticket['travel_to_market']
         
         if not self.schedule:
             # First ticket - start from market
@@ -116,10 +116,10 @@ class Witch:
             collection_start = ticket['start']
             collection_end = ticket['end']
             travel_to_market_end = collection_end + timedelta(minutes=travel_to_market)
-            unload_end = travel_to_market_end + timedelta(minutes=UNLOAD_TIME)
+            unload_end = travel_to_market_end + UNLOAD_DELTA
         else:
             # Get last task end time
-            last_unload_end = self.schedule[-1][4]  # unload_end
+            last_unload_end = self.last_available_time
             
             # Travel from market to cauldron
             earliest_arrival = last_unload_end + timedelta(minutes=travel_to_cauldron)
@@ -133,9 +133,9 @@ class Witch:
             
             # Travel back to market and unload
             travel_to_market_end = collection_end + timedelta(minutes=travel_to_market)
-            unload_end = travel_to_market_end + timedelta(minutes=UNLOAD_TIME)
+            unload_end = travel_to_market_end + UNLOAD_DELTA
         
-        self.schedule.append((
+        self.schedule.append(ScheduleEntry(
             arrival_at_cauldron,
             collection_start,
             collection_end,
@@ -144,6 +144,7 @@ class Witch:
             ticket['cauldron_id'],
             ticket['ticket_id']
         ))
+        self.last_available_time = unload_end
 
 # Use 5 witches with conflict-free assignment
 # Checks timing constraints to ensure no conflicts
@@ -157,40 +158,27 @@ for i in range(1, NUM_WITCHES + 1):
     witches.append(Witch(witch_id))
 
 # Assignment that ensures no timing conflicts
-# Try each witch in round-robin order, but only assign if they can handle it
-current_witch_idx = 0
+# Every trip starts from the market, so the witch who is free earliest is always
+# the best candidate - keep witches in a min-heap keyed on when they become free
+NEVER_BUSY = datetime.min.replace(tzinfo=timezone.utc)
+witch_heap = [(NEVER_BUSY, i, witch) for i, witch in enumerate(witches)]
+heapq.heapify(witch_heap)
 for ticket in ticket_events:
-    assigned = False
-    attempts = 0
+    # Peek at the earliest-free witch; she is re-keyed in place once assigned
+    next_free, idx, witch = witch_heap[0]
     
-    # Try to assign to a witch, starting from current_witch_idx
-    while not assigned and attempts < NUM_WITCHES:
-        witch = witches[current_witch_idx]
-        
-        # Check if this witch can handle the ticket without conflicts
-        if witch.can_handle_ticket(ticket, get_travel_time):
-            witch.assign_ticket(ticket, get_travel_time)
-            ticket_assignments[ticket['ticket_id']] = witch.witch_id
-            assigned = True
-            # Move to next witch for next ticket (round-robin preference)
-            current_witch_idx = (current_witch_idx + 1) % NUM_WITCHES
-        else:
-            # Try next witch
-            current_witch_idx = (current_witch_idx + 1) % NUM_WITCHES
-            attempts += 1
+    if not witch.can_handle_ticket(ticket):
+        # If even the earliest-free witch can't make it (shouldn't happen with 5 witches
+        # for this workload), assign to her anyway but log a warning
+        print(f"⚠️  Warning: Could not find conflict-free assignment for {ticket['ticket_id']}, assigning to {witch.witch_id}")
     
-    if not assigned:
-        # If no witch can handle it (shouldn't happen with 5 witches for this workload),
-        # assign to current witch anyway but log a warning
-        print(f"⚠️  Warning: Could not find conflict-free assignment for {ticket['ticket_id']}, assigning to {witches[current_witch_idx].witch_id}")
-        witch = witches[current_witch_idx]
-        witch.assign_ticket(ticket, get_travel_time)
-        ticket_assignments[ticket['ticket_id']] = witch.witch_id
-        current_witch_idx = (current_witch_idx + 1) % NUM_WITCHES
+    witch.assign_ticket(ticket)
+    ticket_assignments[ticket['ticket_id']] = witch.witch_id
+    heapq.heapreplace(witch_heap, (witch.last_available_time, idx, witch))
 
 print(f"\nAssignment Results:")
 print(f"  Number of witches: {len(witches)}")
-print(f"  Assignment method: Round-robin with conflict checking")
+print(f"  Assignment method: Earliest-available witch with conflict checking")
 print(f"\nWitch assignments:")
 for witch in witches:
     print(f"  {witch.witch_id}: {len(witch.schedule)} tickets")
@@ -210,8 +198,7 @@ for i, witch in enumerate(witches, 1):
 cauldrons_data['couriers'] = new_couriers
 
 # Save updated cauldrons.json
-with open('cauldrons.json', 'w') as f:
-    json.dump(cauldrons_data, f, indent=2)
+save_json('cauldrons.json', cauldrons_data)
 
 print(f"✓ Updated cauldrons.json with {len(new_couriers)} witches (all 24/7)")
 
@@ -222,8 +209,7 @@ for ticket in tickets_data['transport_tickets']:
     if ticket_id in ticket_assignments:
         ticket['courier_id'] = ticket_assignments[ticket_id]
 
-with open('transport_tickets.json', 'w') as f:
-    json.dump(tickets_data, f, indent=2)
+save_json('transport_tickets.json', tickets_data)
 
 print(f"✓ Updated transport_tickets.json with optimized assignments")
 
@@ -233,32 +219,29 @@ witch_schedules_output = {
     'metadata': {
         'total_witches': len(witches),
         'assignment_date': datetime.now().isoformat(),
-        'assignment_method': 'round_robin_conflict_free',
-        'note': 'All witches work 24/7, using round-robin assignment with conflict checking. No timing conflicts - accounts for travel times, drain times, and unload times.'
+        'assignment_method': 'earliest_available_conflict_free',
+        'note': 'All witches work 24/7, each ticket goes to the earliest-available witch with conflict checking. No timing conflicts - accounts for travel times, drain times, and unload times.'
     },
     'witch_schedules': {}
 }
 
 for witch in witches:
-    schedule_entries = []
-    for arrival_at_cauldron, collection_start, collection_end, travel_to_market_end, unload_end, cauldron_id, ticket_id in witch.schedule:
-        schedule_entries.append({
-            'ticket_id': ticket_id,
-            'cauldron_id': cauldron_id,
-            'arrival_at_cauldron': arrival_at_cauldron.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'collection_start': collection_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'collection_end': collection_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'arrival_at_market': travel_to_market_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'unload_complete': unload_end.strftime('%Y-%m-%dT%H:%M:%SZ')
-        })
+    schedule_entries = [{
+        'ticket_id': entry.ticket_id,
+        'cauldron_id': entry.cauldron_id,
+        'arrival_at_cauldron': format_timestamp(entry.arrival_at_cauldron),
+        'collection_start': format_timestamp(entry.collection_start),
+        'collection_end': format_timestamp(entry.collection_end),
+        'arrival_at_market': format_timestamp(entry.travel_to_market_end),
+        'unload_complete': format_timestamp(entry.unload_end)
+    } for entry in witch.schedule]
     
     witch_schedules_output['witch_schedules'][witch.witch_id] = {
         'schedule': schedule_entries,
         'total_tickets': len(schedule_entries)
     }
 
-with open('witch_schedules.json', 'w') as f:
-    json.dump(witch_schedules_output, f, indent=2)
+save_json('witch_schedules.json', witch_schedules_output)
 
 print(f"✓ Created witch_schedules.json")
 
@@ -268,7 +251,7 @@ print("=" * 70)
 print(f"  Changed from 80 witches (with shifts) to {len(witches)} witches (24/7)")
 print(f"  Reduction: {80 - len(witches)} witches ({((80 - len(witches)) / 80 * 100):.1f}% reduction)")
 print(f"  All witches work 24/7 with no shift restrictions")
-print(f"  Tickets assigned using round-robin with conflict checking")
+print(f"  Tickets assigned to the earliest-available witch with conflict checking")
 print(f"  ✓ No timing conflicts - each witch properly accounts for travel/drain/unload times")
 print(f"  ✓ Witches cannot be at two places at the same time")
 
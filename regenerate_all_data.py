@@ -10,31 +10,30 @@ with all constraints:
 - Balanced collections (no cauldrons stuck at max)
 """
 
-import json
+import heapq
+import itertools
 import random
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime, timedelta, timezone
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+
+from data_utils import load_json, save_json, save_json_stream, build_travel_times, format_timestamp
 
 # Load cauldrons data
 print("Loading cauldrons data...")
-with open('cauldrons.json', 'r') as f:
-    cauldrons_data = json.load(f)
+cauldrons_data = load_json('cauldrons.json')
 
 cauldrons = {c['id']: c for c in cauldrons_data['cauldrons']}
 network_edges = cauldrons_data['network']['edges']
 couriers = cauldrons_data['couriers']
 
-# Build travel times
-travel_times = {}
-for edge in network_edges:
-    key = (edge['from'], edge['to'])
-    travel_times[key] = edge['travel_time_minutes']
-    travel_times[(edge['to'], edge['from'])] = edge['travel_time_minutes']
+# Travel times between locations (default 30 min if not found)
+get_travel_time = build_travel_times(cauldrons, network_edges)
 
-def get_travel_time(from_id, to_id):
-    if from_id == to_id:
-        return 0
-    return travel_times.get((from_id, to_id), 30)
+# Witches start every trip at the market and unload there afterwards,
+# so both legs only depend on the cauldron
+market_to_cauldron = {cauldron_id: get_travel_time('market_001', cauldron_id) for cauldron_id in cauldrons}
+cauldron_to_market = {cauldron_id: get_travel_time(cauldron_id, 'market_001') for cauldron_id in cauldrons}
 
 # Fill rates - Increased by ~35% to boost production
 # Creates variation: some slow, some moderate, some fast
@@ -92,18 +91,71 @@ for courier in couriers:
     shift = courier['shift']
     witches_by_shift[shift].append(courier['courier_id'])
 
-def get_witch_shift(timestamp):
-    hour = timestamp.hour
-    if 0 <= hour < 8:
-        return 1
-    elif 8 <= hour < 16:
-        return 2
-    else:
-        return 3
+# Shift 1 works hours 0-7, shift 2 hours 8-15 and shift 3 hours 16-23
+SHIFT_BY_HOUR = [1] * 8 + [2] * 8 + [3] * 8
+
+MINUTES_PER_DAY = 24 * 60
 
-def is_witch_available(witch_id, start_time, end_time, witch_schedules, cauldron_id=None, period_progress=None):
+def get_witch_shift(minute_of_day):
+    return SHIFT_BY_HOUR[minute_of_day // 60]
+
+def fill_levels(levels, draining, rates, max_volumes, uniform, rand):
+    """Apply one minute of filling to every cauldron level in place and return them rounded to 2 places"""
+    rounded = []
+    append_rounded = rounded.append
+    for i, (level, fill_rate, max_vol) in enumerate(zip(levels, rates, max_volumes)):
+        # Fill rate is constant for each cauldron throughout the entire period
+        if draining[i]:
+            # During drain: Don't fill - the drain will account for continuous filling
+            # The net_drain_per_min already accounts for fill rate
+            new_level = level
+        else:
+            # Normal filling when not draining
+            # Apply noise: 98% to 102% (2% variation) - cleaner data
+            base_noise_factor = uniform(0.98, 1.02)
+            
+            # Occasional larger variations (1% chance)
+            if rand() < 0.01:
+                spike_factor = uniform(0.97, 1.03)  # Smaller variation occasionally
+            else:
+                spike_factor = 1.0
+            
+            noise_factor = base_noise_factor * spike_factor
+            fill_amount = fill_rate * noise_factor
+            
+            # Jitter (±0.05% of current level) - cleaner data
+            jitter = uniform(-0.0005, 0.0005) * level
+            
+            # Normal filling - cap at max_vol
+            new_level = min(level + fill_amount + jitter, max_vol)
+        
+        # Ensure level doesn't go negative
+        levels[i] = new_level = max(0, new_level)
+        # Round in the same pass - the rounded levels are what gets recorded and checked this minute
+        append_rounded(round(new_level, 2))
+    return rounded
+
+# Collection trigger ladders as (fraction of max volume, priority), highest band first
+# Every cauldron except 009 triggers at VERY low levels so it never overflows
+TRIGGER_LADDER_DEFAULT = ((0.025, 99), (0.02, 98), (0.015, 97), (0.01, 96), (0.008, 95), (0.005, 94), (0.003, 93))
+# cauldron_009 is kept below 3% until the midpoint, then allowed to overflow
+TRIGGER_LADDER_009_PRE = ((0.03, 99), (0.025, 98), (0.02, 97), (0.015, 96), (0.01, 95), (0.008, 94), (0.005, 93))
+TRIGGER_LADDER_009_POST = ((0.60, 88), (0.55, 83), (0.50, 78))
+
+def build_trigger_bands(max_vol, ladder):
+    """Turn a trigger ladder into ascending absolute levels and their priorities"""
+    ascending = ladder[::-1]
+    return [max_vol * fraction for fraction, _ in ascending], [priority for _, priority in ascending]
+
+def trigger_priority(level, bands):
+    """Return the priority of the highest band the level has reached, or 0 if none"""
+    band_levels, priorities = bands
+    i = bisect_right(band_levels, level)
+    return priorities[i - 1] if i else 0
+
+def is_witch_available(trips, start_time, end_time, cauldron_id=None, period_progress=None):
     """Check if witch is available for the entire period, including buffer time"""
-    if witch_id not in witch_schedules:
+    if not trips:
         return True
     
     # Use smaller buffer for cauldron_009 before midpoint to allow more frequent collections
@@ -112,39 +164,42 @@ def is_witch_available(witch_id, start_time, end_time, witch_schedules, cauldron
         buffer_minutes = 15  # Reduced buffer for urgent collections
     
     # Add buffer before start and after end to ensure adequate spacing
-    buffer_start = start_time - timedelta(minutes=buffer_minutes)
-    buffer_end = end_time + timedelta(minutes=buffer_minutes)
+    # Times are simulation minutes, so the buffer is plain integer arithmetic
+    buffer_start = start_time - buffer_minutes
+    buffer_end = end_time + buffer_minutes
     
-    for event in witch_schedules[witch_id]:
-        event_start = event.get('departure_from_market') or event.get('collection_start')
-        event_end = event.get('unload_complete') or event.get('collection_end')
-        if event_start and event_end:
-            # Check if there's any overlap (including buffers)
-            if not (buffer_end <= event_start or buffer_start >= event_end):
-                return False
-    return True
+    # trips are the witch's (departure, unload_complete) pairs, sorted and never overlapping,
+    # so only the last trip departing before buffer_end can overlap the buffered period
+    i = bisect_left(trips, (buffer_end,))
+    # Check if there's any overlap (including buffers)
+    return i == 0 or trips[i - 1][1] <= buffer_start
 
-def is_cauldron_available(cauldron_id, collection_start, collection_end, transport_tickets, min_gap_minutes=30):
+def is_cauldron_available(collection_start, collection_end, intervals, min_gap_minutes=30):
     """Check if cauldron has no tickets scheduled within min_gap_minutes of the proposed collection time"""
-    # Check all existing tickets for this cauldron
-    for ticket in transport_tickets:
-        if ticket['cauldron_id'] == cauldron_id:
-            existing_start = datetime.fromisoformat(ticket['collection_start_timestamp'].replace('Z', '+00:00'))
-            existing_end = datetime.fromisoformat(ticket['collection_timestamp'].replace('Z', '+00:00'))
-            
-            # Check if proposed collection overlaps with existing collection
-            if not (collection_end <= existing_start or collection_start >= existing_end):
-                return False  # Overlapping
-            
-            # Check if gap between collections is less than minimum required
-            if existing_end < collection_start:
-                gap = (collection_start - existing_end).total_seconds() / 60
-                if gap < min_gap_minutes:
-                    return False  # Gap too small
-            elif collection_end < existing_start:
-                gap = (existing_start - collection_end).total_seconds() / 60
-                if gap < min_gap_minutes:
-                    return False  # Gap too small
+    # intervals are the cauldron's (start, end) collections in simulation minutes, sorted and
+    # never overlapping, so only the neighbours within min_gap_minutes either side can clash
+    i = bisect_left(intervals, (collection_start,))
+    lo = i
+    while lo > 0 and intervals[lo - 1][1] > collection_start - min_gap_minutes:
+        lo -= 1
+    hi = i
+    while hi < len(intervals) and intervals[hi][0] < collection_end + min_gap_minutes:
+        hi += 1
+    
+    for existing_start, existing_end in intervals[lo:hi]:
+        # Check if proposed collection overlaps with existing collection
+        if not (collection_end <= existing_start or collection_start >= existing_end):
+            return False  # Overlapping
+        
+        # Check if gap between collections is less than minimum required
+        if existing_end < collection_start:
+            gap = collection_start - existing_end
+            if gap < min_gap_minutes:
+                return False  # Gap too small
+        elif collection_end < existing_start:
+            gap = existing_start - collection_end
+            if gap < min_gap_minutes:
+                return False  # Gap too small
     
     return True
 
@@ -153,6 +208,21 @@ start_date = datetime(2024, 10, 30, 0, 0, 0, tzinfo=timezone.utc)
 end_date = datetime(2024, 11, 9, 23, 59, 0, tzinfo=timezone.utc)
 
 total_minutes = int((end_date - start_date).total_seconds() / 60) + 1
+
+# The simulation clock is an int minute offset from start_date - datetimes are
+# only built when a timestamp is written out
+def to_minute(timestamp):
+    """Whole minutes from start_date to timestamp"""
+    return (timestamp - start_date) // timedelta(minutes=1)
+
+def from_minute(minute):
+    """Datetime of the given simulation minute"""
+    return start_date + timedelta(minutes=minute)
+
+def parse_minute(timestamp):
+    """Simulation minute of an ISO-8601 UTC timestamp string"""
+    return to_minute(datetime.fromisoformat(timestamp.replace('Z', '+00:00')))
+
 print(f"\nGenerating data from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
 print(f"Total minutes: {total_minutes:,}")
 
@@ -171,27 +241,23 @@ for cauldron_id, cauldron in cauldrons.items():
 
 print(f"Initial levels: {initial_levels}")
 
-# Data structures
-historical_data = []
-transport_tickets = []
-
 # Load existing unreported drains if they exist
 unreported_drains = []
 try:
-    with open('unreported_drains.json', 'r') as f:
-        existing_unreported = json.load(f)
-        unreported_drains = existing_unreported.get('unreported_drains', [])
-        if unreported_drains:
-            print(f"Loaded {len(unreported_drains)} existing unreported drains")
+    existing_unreported = load_json('unreported_drains.json')
+    unreported_drains = existing_unreported.get('unreported_drains', [])
+    if unreported_drains:
+        print(f"Loaded {len(unreported_drains)} existing unreported drains")
 except FileNotFoundError:
     print("No existing unreported_drains.json found, will generate new ones")
     unreported_drains = []
 
-witch_schedules = defaultdict(list)
+# A drain on a cauldron between two simulation minutes (inclusive), applied at the net rate
+PendingDrain = namedtuple('PendingDrain', 'cauldron_id start end duration net_drain')
 pending_drains = []  # Active drains
-cauldrons_needing_collection = {}
-collections_per_cauldron = defaultdict(int)
-ticket_counter = 0
+# (cauldron ID, start minute, end minute) of each loaded drain, parsed once here and
+# reused when placing new unreported drains (pending_drains is consumed by the simulation)
+loaded_drain_minutes = []
 
 # Add existing unreported drains to pending_drains
 for drain_info in unreported_drains:
@@ -205,472 +271,436 @@ for drain_info in unreported_drains:
     fill_during_drain = fill_rate * duration_minutes
     net_drain = drain_amount  # drain_amount is already the net amount
     
-    pending_drains.append({
-        'cauldron_id': drain_info['cauldron_id'],
-        'start': drain_start,
-        'end': drain_end,
-        'duration': duration_minutes,
-        'net_drain': net_drain
-    })
-
-current_levels = {k: v for k, v in initial_levels.items()}
-current_time = start_date
-random.seed(12345)  # For reproducibility
-
-print("\nGenerating data...")
-progress_interval = total_minutes // 10
-
-while current_time <= end_date:
-    # Start with current levels
-    minute_levels = current_levels.copy()
+    pending_drains.append(PendingDrain(
+        drain_info['cauldron_id'],
+        to_minute(drain_start),
+        to_minute(drain_end),
+        duration_minutes,
+        net_drain
+    ))
+    loaded_drain_minutes.append((drain_info['cauldron_id'], pending_drains[-1].start, pending_drains[-1].end))
+
+# Track levels as parallel lists indexed by cauldron position so the
+# per-minute fill works on plain lists instead of nested dict lookups
+cauldron_ids = list(initial_levels.keys())
+cauldron_index = {cauldron_id: i for i, cauldron_id in enumerate(cauldron_ids)}
+max_volumes = {cauldron_id: cauldron['max_volume'] for cauldron_id, cauldron in cauldrons.items()}
+cauldron_max_volumes = [max_volumes[cauldron_id] for cauldron_id in cauldron_ids]
+cauldron_fill_rates = [fill_rates[cauldron_id] for cauldron_id in cauldron_ids]
+current_levels = [initial_levels[cauldron_id] for cauldron_id in cauldron_ids]
+
+# Priority levels are absolute, worked out once per cauldron rather than every minute
+capacity_levels = {cauldron_id: max_vol * 0.99 for cauldron_id, max_vol in max_volumes.items()}
+priority_levels = {}
+for cauldron_id, max_vol in max_volumes.items():
+    threshold = collection_thresholds[cauldron_id] * max_vol
+    priority_levels[cauldron_id] = (max_vol * 0.90, max_vol * 0.80, max_vol * 0.70,
+                                    threshold, threshold * 0.85, threshold * 0.70, threshold * 0.55,
+                                    max_vol * 0.45, max_vol * 0.35, max_vol * 0.30)
+trigger_bands = {cauldron_id: build_trigger_bands(max_vol, TRIGGER_LADDER_DEFAULT)
+                 for cauldron_id, max_vol in max_volumes.items()}
+c009_trigger_bands_pre = build_trigger_bands(max_volumes['cauldron_009'], TRIGGER_LADDER_009_PRE)
+c009_trigger_bands_post = build_trigger_bands(max_volumes['cauldron_009'], TRIGGER_LADDER_009_POST)
+# Largest net drain whose gross drain (net + fill while draining) fits in one witch's capacity:
+# gross_drain = net_drain * (1 + fill_rate / net_drain_rate), with net_drain_rate = base drain rate
+max_net_for_gross = {cauldron_id: MAX_CAPACITY_PER_WITCH / (1 + fill_rates[cauldron_id] / drain_rate) if drain_rate > 0
+                     else MAX_CAPACITY_PER_WITCH
+                     for cauldron_id, drain_rate in drain_rates.items()}
+# The per-minute scans walk every cauldron in order, so give them the tables as lists indexed like cauldron_ids
+cauldron_capacity_levels = [capacity_levels[cauldron_id] for cauldron_id in cauldron_ids]
+cauldron_priority_levels = [priority_levels[cauldron_id] for cauldron_id in cauldron_ids]
+cauldron_trigger_bands = [trigger_bands[cauldron_id] for cauldron_id in cauldron_ids]
+
+def simulate(start_minute, end_minute, current_levels, pending_drains, rng):
+    """Generate minute-by-minute levels and collection tickets from start_minute to end_minute"""
+    uniform, randint, rand = rng.uniform, rng.randint, rng.random
+    # History is kept as rows - the per-minute dicts are only built once the loop is done
+    level_rows = []  # One list of rounded levels per minute, indexed like cauldron_ids
+    transport_tickets = []
+    witch_schedules = defaultdict(list)  # Witch ID -> (departure, unload_complete) of her trips, in time order
+    cauldron_intervals = defaultdict(list)  # Cauldron ID -> sorted (collection_start, collection_end) of its tickets
+    cauldrons_needing_collection = {}
+    collection_ends = []  # Min-heap of (collection_end, cauldron ID) for cauldrons_needing_collection
+    collections_per_cauldron = defaultdict(int)
+    ticket_counter = 0
     
-    # Check which cauldrons are currently being drained (to prevent filling during drain)
-    cauldrons_being_drained = set()
-    for drain in pending_drains:
-        if drain['start'] <= current_time <= drain['end']:
-            cauldrons_being_drained.add(drain['cauldron_id'])
+    # Track which cauldrons are being drained from drain start/end events instead of
+    # rescanning every pending drain each minute
+    drain_seq = itertools.count()  # Tie-breaker so heap entries never compare further
+    drain_starts = [(drain.start, next(drain_seq), cauldron_index[drain.cauldron_id], drain.end)
+                    for drain in pending_drains]  # Min-heap of drains that have not started yet
+    heapq.heapify(drain_starts)
+    drain_ends = []  # Min-heap of (end, seq, cauldron index) for drains in progress
+    draining_counts = [0] * len(cauldron_ids)  # Active drains per cauldron - nonzero means draining
+    progress_interval = total_minutes // 10
+    inv_total_seconds = 1.0 / ((end_minute - start_minute) * 60)
+    day_start_minute = start_date.hour * 60 + start_date.minute  # Minute of the day the clock starts at
     
-    # Update levels with filling FIRST (WITH SLIGHTLY MORE NOISE)
-    for cauldron_id, current_level in minute_levels.items():
-        max_vol = cauldrons[cauldron_id]['max_volume']
-        fill_rate = fill_rates[cauldron_id]
-        # Fill rate is constant for each cauldron throughout the entire period
+    for current_minute in range(start_minute, end_minute + 1):
+        # Calculate what fraction of the period we're in (0.0 = start, 1.0 = end) once per minute
+        period_progress = (current_minute - start_minute) * 60 * inv_total_seconds
+        is_after_midpoint = period_progress >= 0.50  # After midpoint (50%)
+        
+        # Check which cauldrons are currently being drained (to prevent filling during drain)
+        while drain_starts and drain_starts[0][0] <= current_minute:
+            _, seq, i, drain_end = heapq.heappop(drain_starts)
+            draining_counts[i] += 1
+            heapq.heappush(drain_ends, (drain_end, seq, i))
+        while drain_ends and drain_ends[0][0] < current_minute:
+            _, _, i = heapq.heappop(drain_ends)
+            draining_counts[i] -= 1
         
+        # Update levels with filling FIRST (WITH SLIGHTLY MORE NOISE)
         # CRITICAL: During active drains, we still fill but the drain accounts for it
-        # The net_drain_per_min already accounts for filling, so we need to use gross drain rate
-        # OR: Don't fill during drain and use net drain rate
         # Let's use the simpler approach: don't fill during drain, drain uses net rate
+        # This minute's rounded levels, indexed like current_levels
+        minute_levels = fill_levels(current_levels, draining_counts, cauldron_fill_rates, cauldron_max_volumes, uniform, rand)
         
-        # Check if this cauldron is currently being drained
-        is_currently_draining = cauldron_id in cauldrons_being_drained
-        
-        if is_currently_draining:
-            # During drain: Don't fill - the drain will account for continuous filling
-            # The net_drain_per_min already accounts for fill rate
-            new_level = current_level
-        else:
-            # Normal filling when not draining
-            # Apply noise: 98% to 102% (2% variation) - cleaner data
-            base_noise_factor = random.uniform(0.98, 1.02)
-            
-            # Occasional larger variations (1% chance)
-            if random.random() < 0.01:
-                spike_factor = random.uniform(0.97, 1.03)  # Smaller variation occasionally
-            else:
-                spike_factor = 1.0
-            
-            noise_factor = base_noise_factor * spike_factor
-            fill_amount = fill_rate * noise_factor
-            
-            # Jitter (±0.05% of current level) - cleaner data
-            jitter = random.uniform(-0.0005, 0.0005) * current_level
+        # THEN apply any active drains (AFTER filling, so drain accounts for simultaneous filling)
+        # CRITICAL: Drains must always reduce levels, even when at capacity
+        # The net drain per minute already accounts for filling during the drain period
+        # Finished drains are dropped by compacting the list in place behind the loop
+        kept = 0
+        for drain in pending_drains:
+            # Check if current_minute is within drain period
+            if drain.start <= current_minute <= drain.end:
+                # Apply drain - calculate net drain per minute
+                net_drain = drain.net_drain
+                if drain.duration > 0 and net_drain > 0:
+                    net_drain_per_min = net_drain / drain.duration
+                    drain_idx = cauldron_index[drain.cauldron_id]
+                    current_cauldron_level = minute_levels[drain_idx]
+                    
+                    # CRITICAL: Always reduce level by net drain per minute
+                    # net_drain_per_min = base_drain_rate (gross_drain_rate - fill_rate)
+                    # gross_drain_rate = base_drain_rate + fill_rate (true drain rate)
+                    # So subtracting net_drain_per_min accounts for both draining AND filling during this minute
+                    new_level = current_cauldron_level - net_drain_per_min
+                    
+                    # Ensure level doesn't go negative
+                    new_level = max(0, new_level)
+                    
+                    # Ensure the level actually decreased (for debugging)
+                    if current_cauldron_level >= cauldron_capacity_levels[drain_idx]:
+                        # If at capacity, the level MUST decrease
+                        if new_level >= current_cauldron_level:
+                            # This shouldn't happen - net_drain_per_min should always be positive
+                            # But if it does, force a reduction
+                            new_level = current_cauldron_level - max(net_drain_per_min, 0.1)
+                            new_level = max(0, new_level)
+                    
+                    minute_levels[drain_idx] = current_levels[drain_idx] = round(new_level, 2)
             
-            # Normal filling - cap at max_vol
-            new_level = min(current_level + fill_amount + jitter, max_vol)
-        
-        # Ensure level doesn't go negative
-        new_level = max(0, new_level)
-        
-        minute_levels[cauldron_id] = round(new_level, 2)
-        current_levels[cauldron_id] = new_level
-    
-    # THEN apply any active drains (AFTER filling, so drain accounts for simultaneous filling)
-    # CRITICAL: Drains must always reduce levels, even when at capacity
-    # The net drain per minute already accounts for filling during the drain period
-    for drain in list(pending_drains):
-        # Check if current_time is within drain period
-        if drain['start'] <= current_time <= drain['end']:
-            # Apply drain - calculate net drain per minute
-            net_drain = drain.get('net_drain', 0)
-            if drain['duration'] > 0 and net_drain > 0:
-                net_drain_per_min = net_drain / drain['duration']
-                current_cauldron_level = minute_levels[drain['cauldron_id']]
-                
-                # CRITICAL: Always reduce level by net drain per minute
-                # net_drain_per_min = base_drain_rate (gross_drain_rate - fill_rate)
-                # gross_drain_rate = base_drain_rate + fill_rate (true drain rate)
-                # So subtracting net_drain_per_min accounts for both draining AND filling during this minute
-                new_level = current_cauldron_level - net_drain_per_min
-                
-                # Ensure level doesn't go negative
-                new_level = max(0, new_level)
-                
-                # Ensure the level actually decreased (for debugging)
-                if current_cauldron_level >= cauldrons[drain['cauldron_id']]['max_volume'] * 0.99:
-                    # If at capacity, the level MUST decrease
-                    if new_level >= current_cauldron_level:
-                        # This shouldn't happen - net_drain_per_min should always be positive
-                        # But if it does, force a reduction
-                        new_level = current_cauldron_level - max(net_drain_per_min, 0.1)
-                        new_level = max(0, new_level)
-                
-                minute_levels[drain['cauldron_id']] = round(new_level, 2)
-                current_levels[drain['cauldron_id']] = minute_levels[drain['cauldron_id']]
+            # Remove completed drains - keep the rest in their original order
+            if current_minute <= drain.end:
+                pending_drains[kept] = drain
+                kept += 1
+        del pending_drains[kept:]
         
-        # Remove completed drains
-        if current_time > drain['end']:
-            pending_drains.remove(drain)
-    
-    # Check for collections needed - balanced distribution
-    # CRITICAL: First check if ANY cauldron is at capacity - these need immediate attention
-    at_capacity_cauldrons = []
-    regular_candidates = []
-    
-    for cauldron_id, level in minute_levels.items():
-        max_vol = cauldrons[cauldron_id]['max_volume']
-        threshold = collection_thresholds[cauldron_id] * max_vol
-        at_capacity = level >= max_vol * 0.99
-        has_no_collections = collections_per_cauldron[cauldron_id] == 0
+        # Check for collections needed - balanced distribution
+        # CRITICAL: At-capacity cauldrons get the top priority, so they always come out first
+        candidates_for_collection = []
         
-        if cauldron_id not in cauldrons_needing_collection:
-            priority = 0
-            # CRITICAL: At capacity - highest priority always
-            if at_capacity:
-                priority = 100
-            # Very high priority for cauldrons near capacity
-            elif level >= max_vol * 0.90:  # 90% full
-                priority = 98
-            elif level >= max_vol * 0.80:  # 80% full
-                priority = 95
-            elif level >= max_vol * 0.70:  # 70% full
-                priority = 90
-            # High priority for cauldrons at threshold
-            elif level >= threshold:
-                priority = 85
-            # Medium-high priority for cauldrons near threshold
-            elif level >= threshold * 0.85:
-                priority = 80
-            # Medium priority for cauldrons at 70% of threshold
-            elif level >= threshold * 0.70:
-                priority = 75
-            # Medium-low priority for cauldrons at 55% of threshold
-            elif level >= threshold * 0.55:
-                priority = 70
-            # Priority for uncollected cauldrons at lower levels
-            elif has_no_collections and level >= max_vol * 0.45:  # Increased from 0.40
-                priority = 70
-            elif has_no_collections and level >= max_vol * 0.35:  # Increased from 0.30
-                priority = 65
-            # Lower priority but still collect if below threshold but no collections yet
-            elif collections_per_cauldron[cauldron_id] == 0 and level >= max_vol * 0.30:  # Increased from 0.25
-                priority = 60
-            # Additional triggers - VERY aggressive for all cauldrons EXCEPT 009
-            # cauldron_009 should overflow, but ONLY after the midpoint (~50% of period)
-            # Calculate what fraction of the period we're in (0.0 = start, 1.0 = end)
-            period_progress = (current_time - start_date).total_seconds() / (end_date - start_date).total_seconds()
-            is_after_midpoint = period_progress >= 0.50  # After midpoint (50%)
-            
-            if cauldron_id == 'cauldron_009':
-                if is_after_midpoint:
+        for cauldron_id, level, capacity_level, bands, priority_thresholds in zip(
+                cauldron_ids, minute_levels, cauldron_capacity_levels, cauldron_trigger_bands, cauldron_priority_levels):
+            if cauldron_id not in cauldrons_needing_collection:
+                at_capacity = level >= capacity_level
+                
+                # Additional triggers - VERY aggressive for all cauldrons EXCEPT 009
+                # cauldron_009 should overflow, but ONLY after the midpoint (~50% of period)
+                # A reached trigger overrides the priorities below, so it is checked first
+                if cauldron_id == 'cauldron_009':
                     # After midpoint: Allow overflow - moderate triggers
-                    if level >= max_vol * 0.60:  # 60% full - trigger collection
-                        priority = 88
-                    elif level >= max_vol * 0.55:  # 55% full - trigger collection
-                        priority = 83
-                    elif level >= max_vol * 0.50:  # 50% full - trigger collection
-                        priority = 78
-                else:
                     # Before midpoint: EXTREMELY aggressive to prevent overflow until midpoint
-                    # Collect at VERY low levels to keep it from filling up
-                    # Make collections so frequent that it never gets above 3% before midpoint
-                    if level >= max_vol * 0.03:  # 3% full - trigger collection immediately (CRITICAL)
-                        priority = 99
-                    elif level >= max_vol * 0.025:  # 2.5% full - trigger collection
+                    bands = c009_trigger_bands_post if is_after_midpoint else c009_trigger_bands_pre
+                # Otherwise the cauldron's own bands: EXTREMELY aggressive triggers for ALL other
+                # cauldrons to PREVENT overflow - only cauldron_009 should overflow
+                priority = trigger_priority(level, bands)
+                
+                if not priority:
+                    (level_90, level_80, level_70, threshold, threshold_85, threshold_70, threshold_55,
+                     level_45, level_35, level_30) = priority_thresholds
+                    has_no_collections = collections_per_cauldron[cauldron_id] == 0
+                    # CRITICAL: At capacity - highest priority always
+                    if at_capacity:
+                        priority = 100
+                    # Very high priority for cauldrons near capacity
+                    elif level >= level_90:  # 90% full
                         priority = 98
-                    elif level >= max_vol * 0.02:  # 2% full - trigger collection
-                        priority = 97
-                    elif level >= max_vol * 0.015:  # 1.5% full - trigger collection
-                        priority = 96
-                    elif level >= max_vol * 0.01:  # 1% full - trigger collection
+                    elif level >= level_80:  # 80% full
                         priority = 95
-                    elif level >= max_vol * 0.008:  # 0.8% full - trigger collection
-                        priority = 94
-                    elif level >= max_vol * 0.005:  # 0.5% full - trigger collection
-                        priority = 93
-            else:
-                # EXTREMELY aggressive triggers for ALL other cauldrons to PREVENT overflow
-                # Only cauldron_009 should overflow - all others must NEVER overflow
-                # Trigger collections at VERY low levels to prevent any overflow
-                if level >= max_vol * 0.025:  # 2.5% full - trigger collection immediately (CRITICAL)
-                    priority = 99
-                elif level >= max_vol * 0.02:  # 2% full - trigger collection
-                    priority = 98
-                elif level >= max_vol * 0.015:  # 1.5% full - trigger collection
-                    priority = 97
-                elif level >= max_vol * 0.01:  # 1% full - trigger collection
-                    priority = 96
-                elif level >= max_vol * 0.008:  # 0.8% full - trigger collection
-                    priority = 95
-                elif level >= max_vol * 0.005:  # 0.5% full - trigger collection
-                    priority = 94
-                elif level >= max_vol * 0.003:  # 0.3% full - trigger collection
-                    priority = 93
-            
-            if priority > 0:
-                if at_capacity:
-                    at_capacity_cauldrons.append((priority, cauldron_id, level))
-                else:
-                    regular_candidates.append((priority, cauldron_id, level))
-    
-    # Prioritize at-capacity cauldrons first, then regular candidates
-    candidates_for_collection = at_capacity_cauldrons + regular_candidates
-    
-    # Sort by priority (but also consider balance)
-    # Balance is important - prefer cauldrons with fewer collections if priority is similar
-    candidates_for_collection.sort(reverse=True)
-    
-    # Process top candidate, but try to balance
-    if candidates_for_collection:
-        # Strong balancing: if top candidate has many more collections than others, prefer others
-        if len(candidates_for_collection) > 1:
-            top_priority = candidates_for_collection[0][0]
-            top_cid = candidates_for_collection[0][1]
-            top_collections = collections_per_cauldron[top_cid]
-            
-            # Find candidates with same or similar priority but fewer collections
-            for i, (pri, cid, lev) in enumerate(candidates_for_collection[1:], 1):
-                if pri >= top_priority - 5 and collections_per_cauldron[cid] < top_collections - 2:
+                    elif level >= level_70:  # 70% full
+                        priority = 90
+                    # High priority for cauldrons at threshold
+                    elif level >= threshold:
+                        priority = 85
+                    # Medium-high priority for cauldrons near threshold
+                    elif level >= threshold_85:
+                        priority = 80
+                    # Medium priority for cauldrons at 70% of threshold
+                    elif level >= threshold_70:
+                        priority = 75
+                    # Medium-low priority for cauldrons at 55% of threshold
+                    elif level >= threshold_55:
+                        priority = 70
+                    # Priority for uncollected cauldrons at lower levels
+                    elif has_no_collections and level >= level_45:  # Increased from 0.40
+                        priority = 70
+                    elif has_no_collections and level >= level_35:  # Increased from 0.30
+                        priority = 65
+                    # Lower priority but still collect if below threshold but no collections yet
+                    elif has_no_collections and level >= level_30:  # Increased from 0.25
+                        priority = 60
+                
+                if priority > 0:
+                    candidates_for_collection.append((priority, cauldron_id, level))
+        
+        # Pick the top candidate by priority (but also consider balance)
+        # Balance is important - prefer cauldrons with fewer collections if priority is similar
+        # Only the winner is used, so find it in one pass instead of sorting every candidate
+        if candidates_for_collection:
+            top = max(candidates_for_collection)
+            # Strong balancing: if top candidate has many more collections than others, prefer others
+            if len(candidates_for_collection) > 1:
+                top_priority, top_cid, _ = top
+                top_collections = collections_per_cauldron[top_cid]
+                
+                balanced = None  # Best candidate with similar priority but fewer collections
+                best_zero = None  # Best candidate with no collections yet
+                for candidate in candidates_for_collection:
+                    collections = collections_per_cauldron[candidate[1]]
+                    if candidate[0] >= top_priority - 5 and collections < top_collections - 2:
+                        if balanced is None or candidate > balanced:
+                            balanced = candidate
+                    if collections == 0 and (best_zero is None or candidate > best_zero):
+                        best_zero = candidate
+                if balanced is not None:
                     # Swap to prefer this one
-                    candidates_for_collection[0], candidates_for_collection[i] = candidates_for_collection[i], candidates_for_collection[0]
-                    break
-            
-            # Also ensure cauldrons with 0 collections get priority even if lower threshold
-            zero_collections = [c for c in candidates_for_collection if collections_per_cauldron[c[1]] == 0]
-            if zero_collections and collections_per_cauldron[candidates_for_collection[0][1]] > 0:
+                    top = balanced
+                
+                # Also ensure cauldrons with 0 collections get priority even if lower threshold
                 # If top candidate has collections but there's one with 0, prefer the one with 0
-                best_zero = max(zero_collections, key=lambda x: x[0])
-                if best_zero[0] >= 60:  # Increased from 50 - only if it has higher priority
-                    candidates_for_collection.insert(0, best_zero)
-                    candidates_for_collection = [c for c in candidates_for_collection if c != best_zero or candidates_for_collection.index(c) == 0]
-    
-    if candidates_for_collection:
-        priority, cauldron_id, level = candidates_for_collection[0]
-        if cauldron_id not in cauldrons_needing_collection:
-            max_vol = cauldrons[cauldron_id]['max_volume']
-            shift = get_witch_shift(current_time)
-            available_witches = witches_by_shift[shift]
+                if best_zero is not None and collections_per_cauldron[top[1]] > 0:
+                    if best_zero[0] >= 60:  # Increased from 50 - only if it has higher priority
+                        top = best_zero
             
-            witch_id = None
-            for w in available_witches:
-                travel_to = get_travel_time('market_001', cauldron_id)
-                travel_back = get_travel_time(cauldron_id, 'market_001')
-                
-                # Calculate earliest departure time (must be after previous trip ends + buffer)
-                earliest_departure = current_time
-                if w in witch_schedules and len(witch_schedules[w]) > 0:
-                    # Find the latest trip for this witch
-                    latest_trip = max(witch_schedules[w], key=lambda x: x.get('unload_complete') or datetime.min)
-                    last_unload = latest_trip.get('unload_complete')
-                    if last_unload:
-                        # Need buffer time after unload before next departure
-                        earliest_departure = max(current_time, last_unload + timedelta(minutes=MIN_BUFFER_BETWEEN_TRIPS))
+            priority, cauldron_id, level = top
+            if cauldron_id not in cauldrons_needing_collection:
+                shift = get_witch_shift((day_start_minute + current_minute) % MINUTES_PER_DAY)
+                available_witches = witches_by_shift[shift]
+                
+                travel_to = market_to_cauldron[cauldron_id]
+                travel_back = cauldron_to_market[cauldron_id]
+                # These are the same for every witch tried, so look them up once
+                max_vol = max_volumes[cauldron_id]
+                # Fill rate is constant for each cauldron throughout the entire period
+                fill_rate = fill_rates[cauldron_id]
+                # Get base drain rate for this cauldron
+                base_drain_rate = drain_rates[cauldron_id]
                 
-                # Also check if cauldron has recent collections - need 30 min gap between collections on same cauldron
-                for ticket in transport_tickets:
-                    if ticket['cauldron_id'] == cauldron_id:
-                        existing_end = datetime.fromisoformat(ticket['collection_timestamp'].replace('Z', '+00:00'))
+                witch_id = None
+                for w in available_witches:
+                    # Calculate earliest departure time (must be after previous trip ends + buffer)
+                    earliest_departure = current_minute
+                    trips = witch_schedules[w]
+                    if trips:
+                        # Need buffer time after unload before next departure - the last trip unloads latest
+                        earliest_departure = max(current_minute, trips[-1][1] + MIN_BUFFER_BETWEEN_TRIPS)
+                    
+                    # Also check if cauldron has recent collections - need 30 min gap between collections on same cauldron
+                    # The cauldron's collections are kept sorted, so the last one ends latest
+                    intervals = cauldron_intervals[cauldron_id]
+                    if intervals:
+                        existing_end = intervals[-1][1]
                         # Need at least 30 minutes after previous collection ends before starting new one
-                        min_collection_start = existing_end + timedelta(minutes=30)
+                        min_collection_start = existing_end + 30
                         # Convert to departure time (subtract travel time)
-                        min_departure = min_collection_start - timedelta(minutes=travel_to)
+                        min_departure = min_collection_start - travel_to
                         earliest_departure = max(earliest_departure, min_departure)
-                
-                departure = earliest_departure
-                collection_start = departure + timedelta(minutes=travel_to)
-                
-                # Calculate collection amount first (using estimated duration)
-                level_at_collection = level + (fill_rates[cauldron_id] * travel_to)
-                level_at_collection = min(level_at_collection, max_vol)
-                
-                # Collection percentage - adjusted to collect more per trip (reduces total trips)
-                # For cauldron_009 before midpoint, collect more aggressively to prevent overflow
-                period_progress_collection = (current_time - start_date).total_seconds() / (end_date - start_date).total_seconds()
-                is_after_midpoint_collection = period_progress_collection >= 0.50
-                
-                if cauldron_id == 'cauldron_009' and not is_after_midpoint_collection:
-                    collection_percentage = random.uniform(0.50, 0.60)  # Collect even more before midpoint
-                else:
-                    # Collect more per trip to prevent overflow
-                    # For non-009 cauldrons, collect very aggressively to prevent any overflow
-                    if cauldron_id != 'cauldron_009':
-                        collection_percentage = random.uniform(0.50, 0.60)  # Very aggressive for non-009
+                    
+                    departure = earliest_departure
+                    collection_start = departure + travel_to
+                    
+                    # Calculate collection amount first (using estimated duration)
+                    level_at_collection = level + (fill_rate * travel_to)
+                    level_at_collection = min(level_at_collection, max_vol)
+                    
+                    # Collection percentage - adjusted to collect more per trip (reduces total trips)
+                    # For cauldron_009 before midpoint, collect more aggressively to prevent overflow
+                    if cauldron_id == 'cauldron_009' and not is_after_midpoint:
+                        collection_percentage = uniform(0.50, 0.60)  # Collect even more before midpoint
                     else:
-                        collection_percentage = random.uniform(0.35, 0.45)  # Normal for 009
-                amount_to_collect = min(level_at_collection * collection_percentage, MAX_CAPACITY_PER_WITCH)
-                
-                # Estimate initial duration for calculation
-                estimated_duration = random.randint(60, 90)
-                fill_during_estimated = fill_rates[cauldron_id] * estimated_duration
-                actual_drain = amount_to_collect
-                
-                # Ensure we're actually draining something meaningful (but much smaller amounts)
-                if actual_drain <= fill_during_estimated:
-                    actual_drain = fill_during_estimated + random.uniform(15, 40)  # Reduced from 30-80 to 15-40
-                    amount_to_collect = actual_drain
-                
-                # Initial cap at available level (gross drain capacity check happens after duration calculation)
-                actual_drain = min(actual_drain, level_at_collection)
-                actual_drain = max(15, actual_drain)  # Minimum net drain
-                
-                # CRITICAL: actual_drain is the NET amount that will be drained
-                # We need to ensure gross_drain (actual_drain + fill_during_collection) <= MAX_CAPACITY_PER_WITCH
-                # Duration will be calculated based on this amount, accounting for filling during collection
-                
-                fill_rate = fill_rates[cauldron_id]
-                # Fill rate is constant for each cauldron throughout the entire period
-                
-                # Get base drain rate for this cauldron
-                base_drain_rate = drain_rates[cauldron_id]
-                
-                # Calculate gross drain rate: true drain rate = base_drain_rate + fill_rate
-                # This accounts for potion being generated during the drain
-                gross_drain_rate = base_drain_rate + fill_rate
-                
-                # Net drain rate = gross_drain_rate - fill_rate = base_drain_rate
-                # This is the actual net amount drained per minute
-                net_drain_rate = base_drain_rate
-                
-                # Calculate maximum net_drain that ensures gross_drain <= MAX_CAPACITY_PER_WITCH
-                # gross_drain = net_drain + fill_rate * (net_drain / net_drain_rate)
-                # gross_drain = net_drain * (1 + fill_rate / net_drain_rate)
-                # So: max_net_drain = MAX_CAPACITY_PER_WITCH / (1 + fill_rate / net_drain_rate)
-                if net_drain_rate > 0:
-                    max_net_drain_for_capacity = MAX_CAPACITY_PER_WITCH / (1 + fill_rate / net_drain_rate)
-                    # Cap actual_drain to ensure gross_drain doesn't exceed capacity
-                    actual_drain = min(actual_drain, max_net_drain_for_capacity)
-                
-                # Duration calculation:
-                #   actual_drain = gross_drain - fill_during_collection
-                #   gross_drain = gross_drain_rate * duration
-                #   fill_during_collection = fill_rate * duration
-                #   So: actual_drain = (gross_drain_rate - fill_rate) * duration = base_drain_rate * duration
-                #   Solving: duration = actual_drain / base_drain_rate
-                
-                if net_drain_rate > 0:
-                    # Duration from actual drain amount (using per-cauldron base drain rate)
-                    collection_duration = int(actual_drain / net_drain_rate)
-                else:
-                    # Fallback if net drain rate is somehow zero or negative
-                    collection_duration = int(actual_drain / 0.1)  # Use 0.1 L/min as fallback
-                
-                # Clamp duration to reasonable bounds (15-180 minutes)
-                collection_duration = max(15, min(180, collection_duration))
-                
-                # Recalculate fill during collection with actual duration
-                fill_during_collection = fill_rate * collection_duration
-                
-                # Calculate gross drain: level change + fill during collection
-                # This is the total volume actually collected from the cauldron
-                gross_drain = actual_drain + fill_during_collection
-                
-                # Final safety check: ensure gross_drain doesn't exceed capacity
-                # (Shouldn't happen with above logic, but provides safety margin)
-                if gross_drain > MAX_CAPACITY_PER_WITCH:
-                    # Adjust net_drain to keep gross_drain within capacity
+                        # Collect more per trip to prevent overflow
+                        # For non-009 cauldrons, collect very aggressively to prevent any overflow
+                        if cauldron_id != 'cauldron_009':
+                            collection_percentage = uniform(0.50, 0.60)  # Very aggressive for non-009
+                        else:
+                            collection_percentage = uniform(0.35, 0.45)  # Normal for 009
+                    amount_to_collect = min(level_at_collection * collection_percentage, MAX_CAPACITY_PER_WITCH)
+                    
+                    # Estimate initial duration for calculation
+                    estimated_duration = randint(60, 90)
+                    fill_during_estimated = fill_rate * estimated_duration
+                    actual_drain = amount_to_collect
+                    
+                    # Ensure we're actually draining something meaningful (but much smaller amounts)
+                    if actual_drain <= fill_during_estimated:
+                        actual_drain = fill_during_estimated + uniform(15, 40)  # Reduced from 30-80 to 15-40
+                        amount_to_collect = actual_drain
+                    
+                    # Initial cap at available level (gross drain capacity check happens after duration calculation)
+                    actual_drain = min(actual_drain, level_at_collection)
+                    actual_drain = max(15, actual_drain)  # Minimum net drain
+                    
+                    # CRITICAL: actual_drain is the NET amount that will be drained
+                    # We need to ensure gross_drain (actual_drain + fill_during_collection) <= MAX_CAPACITY_PER_WITCH
+                    # Duration will be calculated based on this amount, accounting for filling during collection
+                    
+                    # Calculate gross drain rate: true drain rate = base_drain_rate + fill_rate
+                    # This accounts for potion being generated during the drain
+                    gross_drain_rate = base_drain_rate + fill_rate
+                    
+                    # Net drain rate = gross_drain_rate - fill_rate = base_drain_rate
+                    # This is the actual net amount drained per minute
+                    net_drain_rate = base_drain_rate
+                    
+                    # Calculate maximum net_drain that ensures gross_drain <= MAX_CAPACITY_PER_WITCH
+                    # gross_drain = net_drain + fill_rate * (net_drain / net_drain_rate)
                     # gross_drain = net_drain * (1 + fill_rate / net_drain_rate)
+                    # So: max_net_drain = MAX_CAPACITY_PER_WITCH / (1 + fill_rate / net_drain_rate)
                     if net_drain_rate > 0:
-                        max_net_for_gross = MAX_CAPACITY_PER_WITCH / (1 + fill_rate / net_drain_rate)
-                        actual_drain = max_net_for_gross
-                        collection_duration = int(actual_drain / net_drain_rate) if net_drain_rate > 0 else int(actual_drain / 0.1)
-                        collection_duration = max(15, min(180, collection_duration))
-                        fill_during_collection = fill_rate * collection_duration
-                        gross_drain = actual_drain + fill_during_collection
-                
-                # Verify: With per-cauldron drain rate:
-                #   actual_drain = net_drain_rate * duration = base_drain_rate * duration (level change)
-                #   fill_during_collection = fill_rate * duration (potion generated during drain)
-                #   gross_drain = actual_drain + fill_during_collection (total volume collected)
-                # This ensures the levels will drop by exactly actual_drain over the duration
-                
-                # Recalculate with actual duration
-                collection_end = collection_start + timedelta(minutes=collection_duration)
-                arrival_back = collection_end + timedelta(minutes=travel_back)
-                unload_complete = arrival_back + timedelta(minutes=UNLOAD_TIME)
-                
-                # CRITICAL: Check both witch availability AND cauldron availability (30 min gap)
-                period_progress_availability = (current_time - start_date).total_seconds() / (end_date - start_date).total_seconds()
-                witch_available = is_witch_available(w, departure, unload_complete, witch_schedules, cauldron_id, period_progress_availability)
-                cauldron_available = is_cauldron_available(cauldron_id, collection_start, collection_end, transport_tickets, min_gap_minutes=30)
-                
-                if witch_available and cauldron_available:
-                    witch_id = w
+                        max_net_drain_for_capacity = max_net_for_gross[cauldron_id]
+                        # Cap actual_drain to ensure gross_drain doesn't exceed capacity
+                        actual_drain = min(actual_drain, max_net_drain_for_capacity)
                     
-                    # Schedule event
-                    schedule_event = {
-                        'departure_from_market': departure,
-                        'collection_start': collection_start,
-                        'collection_end': collection_end,
-                        'unload_complete': unload_complete,
-                        'cauldron_id': cauldron_id,
-                        'actual_drain': actual_drain,  # Net drain (for level calculations)
-                        'gross_drain': gross_drain,  # Total volume collected
-                        'witch_id': witch_id
-                    }
-                    witch_schedules[witch_id].append(schedule_event)
+                    # Duration calculation:
+                    #   actual_drain = gross_drain - fill_during_collection
+                    #   gross_drain = gross_drain_rate * duration
+                    #   fill_during_collection = fill_rate * duration
+                    #   So: actual_drain = (gross_drain_rate - fill_rate) * duration = base_drain_rate * duration
+                    #   Solving: duration = actual_drain / base_drain_rate
                     
-                    # Add drain to pending (use net_drain for level calculations)
-                    pending_drains.append({
-                        'cauldron_id': cauldron_id,
-                        'start': collection_start,
-                        'end': collection_end,
-                        'duration': collection_duration,
-                        'net_drain': actual_drain  # Net drain for level changes
-                    })
+                    if net_drain_rate > 0:
+                        # Duration from actual drain amount (using per-cauldron base drain rate)
+                        collection_duration = int(actual_drain / net_drain_rate)
+                    else:
+                        # Fallback if net drain rate is somehow zero or negative
+                        collection_duration = int(actual_drain / 0.1)  # Use 0.1 L/min as fallback
                     
-                    # Determine if suspicious (12% chance)
-                    is_suspicious = random.random() < 0.12
-                    # Reported amount should be based on gross_drain (total volume collected)
-                    reported_amount = gross_drain
+                    # Clamp duration to reasonable bounds (15-180 minutes)
+                    collection_duration = max(15, min(180, collection_duration))
                     
-                    if is_suspicious:
-                        underreport_factor = random.uniform(0.75, 0.92)
-                        reported_amount = gross_drain * underreport_factor
+                    # Recalculate fill during collection with actual duration
+                    fill_during_collection = fill_rate * collection_duration
                     
-                    # Create ticket
-                    # amount_collected should be the gross drain (level change + fill during collection)
-                    ticket_counter += 1
-                    date_str = collection_start.strftime('%Y%m%d')
-                    ticket_id = f"TT_{date_str}_{ticket_counter:03d}"
+                    # Calculate gross drain: level change + fill during collection
+                    # This is the total volume actually collected from the cauldron
+                    gross_drain = actual_drain + fill_during_collection
                     
-                    ticket = {
-                        'ticket_id': ticket_id,
-                        'cauldron_id': cauldron_id,
-                        'collection_start_timestamp': collection_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'collection_timestamp': collection_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'amount_collected': round(reported_amount, 2),  # Gross drain (or underreported if suspicious)
-                        'courier_id': witch_id,
-                        'status': 'completed',
-                        'notes': 'Sequential collection'
-                    }
+                    # Final safety check: ensure gross_drain doesn't exceed capacity
+                    # (Shouldn't happen with above logic, but provides safety margin)
+                    if gross_drain > MAX_CAPACITY_PER_WITCH:
+                        # Adjust net_drain to keep gross_drain within capacity
+                        # gross_drain = net_drain * (1 + fill_rate / net_drain_rate)
+                        if net_drain_rate > 0:
+                            actual_drain = max_net_for_gross[cauldron_id]
+                            collection_duration = int(actual_drain / net_drain_rate) if net_drain_rate > 0 else int(actual_drain / 0.1)
+                            collection_duration = max(15, min(180, collection_duration))
+                            fill_during_collection = fill_rate * collection_duration
+                            gross_drain = actual_drain + fill_during_collection
                     
-                    if is_suspicious:
-                        ticket['is_suspicious'] = True
-                        ticket['suspicious_type'] = 'underreported'
-                        ticket['_actual_amount_collected'] = round(gross_drain, 2)  # True gross amount collected
+                    # Verify: With per-cauldron drain rate:
+                    #   actual_drain = net_drain_rate * duration = base_drain_rate * duration (level change)
+                    #   fill_during_collection = fill_rate * duration (potion generated during drain)
+                    #   gross_drain = actual_drain + fill_during_collection (total volume collected)
+                    # This ensures the levels will drop by exactly actual_drain over the duration
                     
-                    transport_tickets.append(ticket)
-                    collections_per_cauldron[cauldron_id] += 1
-                    cauldrons_needing_collection[cauldron_id] = collection_end
+                    # Recalculate with actual duration
+                    collection_end = collection_start + collection_duration
+                    arrival_back = collection_end + travel_back
+                    unload_complete = arrival_back + UNLOAD_TIME
                     
-                    break
-    
-    # Remove completed collections from tracking
-    for cauldron_id in list(cauldrons_needing_collection.keys()):
-        if current_time >= cauldrons_needing_collection[cauldron_id]:
+                    # CRITICAL: Check both witch availability AND cauldron availability (30 min gap)
+                    witch_available = is_witch_available(trips, departure, unload_complete, cauldron_id, period_progress)
+                    cauldron_available = is_cauldron_available(collection_start, collection_end, cauldron_intervals[cauldron_id], min_gap_minutes=30)
+                    
+                    if witch_available and cauldron_available:
+                        witch_id = w
+                        
+                        # Schedule the trip - it departs after her last unload, so the list stays sorted
+                        trips.append((departure, unload_complete))
+                        
+                        # Add drain to pending (use net_drain for level calculations)
+                        pending_drains.append(PendingDrain(
+                            cauldron_id,
+                            collection_start,
+                            collection_end,
+                            collection_duration,
+                            actual_drain  # Net drain for level changes
+                        ))
+                        heapq.heappush(drain_starts, (collection_start, next(drain_seq), cauldron_index[cauldron_id], collection_end))
+                        
+                        # Determine if suspicious (12% chance)
+                        is_suspicious = rand() < 0.12
+                        # Reported amount should be based on gross_drain (total volume collected)
+                        reported_amount = gross_drain
+                        
+                        if is_suspicious:
+                            underreport_factor = uniform(0.75, 0.92)
+                            reported_amount = gross_drain * underreport_factor
+                        
+                        # Create ticket
+                        # amount_collected should be the gross drain (level change + fill during collection)
+                        ticket_counter += 1
+                        collection_start_timestamp = format_timestamp(from_minute(collection_start))
+                        date_str = collection_start_timestamp[:10].replace('-', '')  # YYYYMMDD
+                        ticket_id = f"TT_{date_str}_{ticket_counter:03d}"
+                        
+                        ticket = {
+                            'ticket_id': ticket_id,
+                            'cauldron_id': cauldron_id,
+                            'collection_start_timestamp': collection_start_timestamp,
+                            'collection_timestamp': format_timestamp(from_minute(collection_end)),
+                            'amount_collected': round(reported_amount, 2),  # Gross drain (or underreported if suspicious)
+                            'courier_id': witch_id,
+                            'status': 'completed',
+                            'notes': 'Sequential collection'
+                        }
+                        
+                        if is_suspicious:
+                            ticket['is_suspicious'] = True
+                            ticket['suspicious_type'] = 'underreported'
+                            ticket['_actual_amount_collected'] = round(gross_drain, 2)  # True gross amount collected
+                        
+                        transport_tickets.append(ticket)
+                        insort(cauldron_intervals[cauldron_id], (collection_start, collection_end))
+                        collections_per_cauldron[cauldron_id] += 1
+                        cauldrons_needing_collection[cauldron_id] = collection_end
+                        heapq.heappush(collection_ends, (collection_end, cauldron_id))
+                        
+                        break
+        
+        # Remove completed collections from tracking - only the ones whose end has come up
+        while collection_ends and collection_ends[0][0] <= current_minute:
+            _, cauldron_id = heapq.heappop(collection_ends)
             del cauldrons_needing_collection[cauldron_id]
+        
+        # Store this minute's data
+        level_rows.append(minute_levels)
+        
+        # Progress indicator
+        if len(level_rows) % progress_interval == 0:
+            progress = (len(level_rows) / total_minutes) * 100
+            print(f"  Progress: {progress:.0f}%")
     
-    # Store this minute's data
-    historical_data.append({
-        'timestamp': current_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
-        'cauldron_levels': minute_levels.copy()
-    })
-    
-    # Progress indicator
-    if len(historical_data) % progress_interval == 0:
-        progress = (len(historical_data) / total_minutes) * 100
-        print(f"  Progress: {progress:.0f}%")
-    
-    current_time += timedelta(minutes=1)
+    # Timestamps are only formatted now that the loop is done
+    timestamps = [format_timestamp(from_minute(minute)) for minute in range(start_minute, end_minute + 1)]
+    return timestamps, level_rows, transport_tickets, collections_per_cauldron
+
+# Dedicated generators keep the simulation and the unreported drains reproducible
+sim_rng = random.Random(12345)  # For reproducibility
+print("\nGenerating data...")
+timestamps, level_rows, transport_tickets, collections_per_cauldron = simulate(0, total_minutes - 1, current_levels, pending_drains, sim_rng)
 
 # Add unreported drains (10-12 instances across the entire period)
 # Always generate new unreported drains to ensure we have the right amount
@@ -683,59 +713,71 @@ else:
     added_unreported_drains = []
 
 # Generate unreported drains to reach target count (10-12 total)
-target_unreported_count = random.randint(10, 12)
+target_unreported_count = sim_rng.randint(10, 12)
 needed_unreported = target_unreported_count - len(added_unreported_drains)
 
 if needed_unreported > 0:
     print(f"\nGenerating {needed_unreported} additional unreported drains (target: {target_unreported_count}, existing: {len(added_unreported_drains)})...")
-    random.seed(54321)
-
-    # Get all ticket times to avoid overlaps
-    ticket_times = []
-    for ticket in transport_tickets:
-        start = datetime.fromisoformat(ticket['collection_start_timestamp'].replace('Z', '+00:00'))
-        end = datetime.fromisoformat(ticket['collection_timestamp'].replace('Z', '+00:00'))
-        ticket_times.append((start, end))
+    drain_rng = random.Random(54321)
+
+    # Get all ticket times to avoid overlaps, sorted by start so each drain is only
+    # checked against the tickets around it
+    # Every timestamp is parsed once here into simulation minutes, so the checks below are int compares
+    ticket_times = sorted((parse_minute(ticket['collection_start_timestamp']), parse_minute(ticket['collection_timestamp']))
+                          for ticket in transport_tickets)
+    ticket_starts = [ticket_start for ticket_start, _ in ticket_times]
+    # No ticket lasts longer than this, so one starting any earlier cannot come near a drain
+    max_ticket_length = max((end - start for start, end in ticket_times), default=0)
+    # Cauldron ID -> (start minute, end minute) of its unreported drains, kept alongside added_unreported_drains
+    # so a candidate is only checked against drains on its own cauldron
+    # Every loaded drain has a start timestamp, so these cover the loaded drains kept above
+    added_by_cauldron = defaultdict(list)
+    for loaded_cauldron_id, loaded_start, loaded_end in loaded_drain_minutes:
+        added_by_cauldron[loaded_cauldron_id].append((loaded_start, loaded_end))
 
     def overlaps_with_tickets(drain_start, drain_end, min_gap_minutes=30):
         """Check if drain overlaps with any ticket times or is too close (< min_gap_minutes)"""
-        for ticket_start, ticket_end in ticket_times:
+        # Tickets can overlap each other (different cauldrons), so bound the search by start time:
+        # a clashing ticket starts before drain_end + gap and ends after drain_start - gap
+        lo = bisect_left(ticket_starts, drain_start - min_gap_minutes - max_ticket_length)
+        hi = bisect_left(ticket_starts, drain_end + min_gap_minutes)
+        for ticket_start, ticket_end in ticket_times[lo:hi]:
             # Check for direct overlap
             if not (drain_end <= ticket_start or drain_start >= ticket_end):
                 return True
             # Check if gap is too small (less than min_gap_minutes)
             if drain_end < ticket_start:
-                gap = (ticket_start - drain_end).total_seconds() / 60
+                gap = ticket_start - drain_end
                 if gap < min_gap_minutes:
                     return True
             elif ticket_end < drain_start:
-                gap = (drain_start - ticket_end).total_seconds() / 60
+                gap = drain_start - ticket_end
                 if gap < min_gap_minutes:
                     return True
         return False
 
-    def overlaps_with_unreported_drains(drain_start, drain_end, cauldron_id, added_drains, min_gap_minutes=30):
+    def overlaps_with_unreported_drains(drain_start, drain_end, cauldron_drains, min_gap_minutes=30):
         """Check if drain overlaps or is too close to existing unreported drains on same cauldron"""
-        for existing_drain in added_drains:
-            if existing_drain['cauldron_id'] == cauldron_id:
-                existing_start = datetime.fromisoformat(existing_drain['drain_start_timestamp'].replace('Z', '+00:00'))
-                existing_end = datetime.fromisoformat(existing_drain['drain_end_timestamp'].replace('Z', '+00:00'))
-                # Check for direct overlap
-                if not (drain_end <= existing_start or drain_start >= existing_end):
+        for existing_start, existing_end in cauldron_drains:
+            # Check for direct overlap
+            if not (drain_end <= existing_start or drain_start >= existing_end):
+                return True
+            # Check if gap is too small
+            if drain_end < existing_start:
+                gap = existing_start - drain_end
+                if gap < min_gap_minutes:
+                    return True
+            elif existing_end < drain_start:
+                gap = drain_start - existing_end
+                if gap < min_gap_minutes:
                     return True
-                # Check if gap is too small
-                if drain_end < existing_start:
-                    gap = (existing_start - drain_end).total_seconds() / 60
-                    if gap < min_gap_minutes:
-                        return True
-                elif existing_end < drain_start:
-                    gap = (drain_start - existing_end).total_seconds() / 60
-                    if gap < min_gap_minutes:
-                        return True
         return False
 
     # Generate unreported drains at random times throughout the period
     # Allow them to be placed near tickets (within 30 min) but not overlapping
+    # Attempts are drawn one at a time: how many values an attempt takes from drain_rng depends on
+    # the cauldron and amount it picks, so sampling start times up front would change every drain
+    # after the first.
     attempts = 0
     max_attempts = 2000  # Increased to allow more attempts with tighter constraints
 
@@ -746,27 +788,19 @@ if needed_unreported > 0:
             break
     
         # Random time within the period (allow anywhere, not just gaps)
-        drain_start = start_date + timedelta(
-            minutes=random.randint(200, total_minutes - 200)
-        )
+        drain_start_minute = drain_rng.randint(200, total_minutes - 200)
+        drain_start = from_minute(drain_start_minute)
     
-        # Find level at this time - find closest entry to drain_start
-        level_at_time = None
-        entry_at_start = None
-        min_diff = float('inf')
-        for entry in historical_data:
-            ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-            diff = abs((ts - drain_start).total_seconds())
-            if diff < 60 and diff < min_diff:  # Within 1 minute and closest
-                level_at_time = entry['cauldron_levels']
-                entry_at_start = entry
-                min_diff = diff
+        # Find level at this time - level_rows has one row per minute from start_date,
+        # so the row for a simulation minute is found by index rather than by scanning
+        level_at_time = level_rows[drain_start_minute]
     
-        if level_at_time and entry_at_start:
+        if level_at_time:
             # Choose a cauldron with reasonable level
-            candidates = [(cid, lvl) for cid, lvl in level_at_time.items() if lvl > 200]
+            candidates = [(cid, lvl) for cid, lvl in zip(cauldron_ids, level_at_time) if lvl > 200]
             if candidates:
-                cauldron_id, level = random.choice(candidates)
+                cauldron_id, level = drain_rng.choice(candidates)
+                col = cauldron_index[cauldron_id]
             
                 # Unreported drains - ensure significant drain amounts that show visible drops
                 fill_rate = fill_rates[cauldron_id]
@@ -775,20 +809,17 @@ if needed_unreported > 0:
                 
                 # Calculate maximum net_drain that ensures gross_drain <= MAX_CAPACITY_PER_WITCH
                 # gross_drain = net_drain * (1 + fill_rate / net_drain_rate)
-                if net_drain_rate > 0:
-                    max_net_drain_for_capacity = MAX_CAPACITY_PER_WITCH / (1 + fill_rate / net_drain_rate)
-                else:
-                    max_net_drain_for_capacity = MAX_CAPACITY_PER_WITCH
+                max_net_drain_for_capacity = max_net_for_gross[cauldron_id]
             
                 # Calculate NET drain amount first (what will show as a drop)
                 # Target a MINIMUM net drop of 15-50L, capped to ensure gross_drain <= capacity
-                min_net_drop = random.uniform(15, 50)  # Reduced range
+                min_net_drop = drain_rng.uniform(15, 50)  # Reduced range
                 max_drain = min(level * 0.50, level - 15, max_net_drain_for_capacity)  # Cap to ensure gross <= capacity
             
                 # Generate NET drain amount (ensures minimum visible drop)
                 # We want at least min_net_drop as the net amount
                 if min_net_drop < max_drain:
-                    drain_amount = random.uniform(min_net_drop, max_drain)
+                    drain_amount = drain_rng.uniform(min_net_drop, max_drain)
                 else:
                     drain_amount = min(min_net_drop, max_net_drain_for_capacity)
             
@@ -810,11 +841,12 @@ if needed_unreported > 0:
                 drain_end = drain_start + timedelta(minutes=drain_duration)
                 
                 # Check if this drain overlaps with tickets (need 30 min gap)
-                if overlaps_with_tickets(drain_start, drain_end, min_gap_minutes=30):
+                drain_end_minute = drain_start_minute + drain_duration
+                if overlaps_with_tickets(drain_start_minute, drain_end_minute, min_gap_minutes=30):
                     continue  # Skip if too close to a ticket
                 
                 # Check if this drain overlaps with other unreported drains on same cauldron (need 30 min gap)
-                if overlaps_with_unreported_drains(drain_start, drain_end, cauldron_id, added_unreported_drains, min_gap_minutes=30):
+                if overlaps_with_unreported_drains(drain_start_minute, drain_end_minute, added_by_cauldron[cauldron_id], min_gap_minutes=30):
                     continue  # Skip if too close to another unreported drain on same cauldron
                 
                 # Recalculate fill_during_drain with actual duration
@@ -827,8 +859,7 @@ if needed_unreported > 0:
                 if gross_drain > MAX_CAPACITY_PER_WITCH:
                     # Adjust net_drain to keep gross_drain within capacity
                     if net_drain_rate > 0:
-                        max_net_for_gross = MAX_CAPACITY_PER_WITCH / (1 + fill_rate / net_drain_rate)
-                        drain_amount = max_net_for_gross
+                        drain_amount = max_net_for_gross[cauldron_id]
                         drain_duration = int(drain_amount / net_drain_rate) if net_drain_rate > 0 else int(drain_amount / 0.1)
                         drain_duration = max(15, min(180, drain_duration))
                         drain_end = drain_start + timedelta(minutes=drain_duration)
@@ -842,11 +873,7 @@ if needed_unreported > 0:
                 if net_drain_per_min < 0.3:
                     # Force larger NET drain to ensure visibility (but cap to ensure gross <= capacity)
                     min_net_drop = 30
-                    if net_drain_rate > 0:
-                        max_net = MAX_CAPACITY_PER_WITCH / (1 + fill_rate / net_drain_rate)
-                        drain_amount = min(min_net_drop + random.uniform(10, 30), max_net)
-                    else:
-                        drain_amount = min(min_net_drop + random.uniform(10, 30), MAX_CAPACITY_PER_WITCH)
+                    drain_amount = min(min_net_drop + drain_rng.uniform(10, 30), max_net_for_gross[cauldron_id])
                     # Recalculate duration with new drain amount using per-cauldron drain rate
                     if net_drain_rate > 0:
                         drain_duration = int(drain_amount / net_drain_rate)
@@ -863,58 +890,34 @@ if needed_unreported > 0:
                 if expected_total_drop < 25:  # Reduced from 40L
                     continue  # Skip this one if drop is too small
             
-                # Get level BEFORE drain starts (for verification) - get from entry just before drain_start
-                level_before = None
-                for entry in historical_data:
-                    ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-                    if ts < drain_start and abs((ts - drain_start).total_seconds()) < 300:  # Within 5 minutes before
-                        level_before = entry['cauldron_levels'].get(cauldron_id)
-                        if level_before is not None:
-                            break
-            
-                # Fallback: use level_at_time if we can't find one before
-                if level_before is None:
-                    level_before = level_at_time.get(cauldron_id)
-            
-                if level_before is None:
-                    continue  # Skip if we can't find level before
+                # Get level BEFORE drain starts (for verification) - get from the row up to 4 minutes before drain_start
+                before_rows = level_rows[max(0, drain_start_minute - 4):drain_start_minute]
+                # Fallback: use level_at_time if there is no row before
+                level_before = before_rows[0][col] if before_rows else level_at_time[col]
             
                 # Apply drain minute by minute during the drain period
-                # CRITICAL: Apply drain to ALL entries within the drain period
-                drain_count = 0
-                for idx, entry in enumerate(historical_data):
-                    ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-                    # Match entries within drain period (inclusive of start and end)
-                    if drain_start <= ts <= drain_end:
-                        # Get current level for this cauldron
-                        if cauldron_id in entry['cauldron_levels']:
-                            current_level = entry['cauldron_levels'][cauldron_id]
-                            # Apply net drain - subtract net drain per minute
-                            # This accounts for the fact that filling already happened, so we just subtract net drain
-                            new_level = current_level - net_drain_per_min
-                            entry['cauldron_levels'][cauldron_id] = max(0, round(new_level, 2))
-                            drain_count += 1
+                # CRITICAL: Apply drain to ALL rows within the drain period
+                drain_end_minute = drain_start_minute + drain_duration
+                # Rows within drain period (inclusive of start and end) - a slice, so no bounds checks per minute
+                drain_rows = level_rows[drain_start_minute:drain_end_minute + 1]
+                # Apply net drain - subtract net drain per minute
+                # This accounts for the fact that filling already happened, so we just subtract net drain
+                # Rounded as applied, not at save time: the drop check below and later attempts'
+                # cauldron picks read these stored levels, so they must match what gets written
+                for row in drain_rows:
+                    row[col] = max(0, round(row[col] - net_drain_per_min, 2))
             
                 # Verify drain was applied and check level change
-                if drain_count == 0:
+                if not drain_rows:
                     continue  # Skip if drain wasn't applied
             
-                # Find level AFTER drain ends - get from entry just after drain_end
+                # Find level AFTER drain ends - get from the row just after drain_end
                 level_after = None
-                for entry in historical_data:
-                    ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-                    if ts > drain_end and abs((ts - drain_end).total_seconds()) < 300:  # Within 5 minutes after
-                        level_after = entry['cauldron_levels'].get(cauldron_id)
-                        if level_after is not None:
-                            break
-            
+                if drain_end_minute + 1 < len(level_rows):
+                    level_after = level_rows[drain_end_minute + 1][col]
                 # Fallback: try exact match
-                if level_after is None:
-                    for entry in historical_data:
-                        ts = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-                        if abs((ts - drain_end).total_seconds()) < 60:
-                            level_after = entry['cauldron_levels'].get(cauldron_id)
-                            break
+                elif drain_end_minute < len(level_rows):
+                    level_after = level_rows[drain_end_minute][col]
             
                 # Verify level actually dropped
                 if level_after is not None and level_before is not None:
@@ -926,24 +929,30 @@ if needed_unreported > 0:
                     # Success! Add the drain
                     drain_info = {
                         'cauldron_id': cauldron_id,
-                        'drain_start_timestamp': drain_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'drain_end_timestamp': drain_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                        'drain_start_timestamp': format_timestamp(drain_start),
+                        'drain_end_timestamp': format_timestamp(drain_end),
                         'estimated_amount_drained_liters': round(drain_amount, 2),
                         'duration_minutes': drain_duration,
                         'note': 'NO TICKET EXISTS - this is an unreported drain'
                     }
                 
                     added_unreported_drains.append(drain_info)
+                    added_by_cauldron[cauldron_id].append((drain_start_minute, drain_end_minute))
                     unreported_drains.append(drain_info)
                     print(f"  ✓ Added unreported drain: {cauldron_id} at {drain_start.strftime('%Y-%m-%d %H:%M')} ({actual_drop:.1f}L drop)")
                 else:
                     continue  # Skip if we can't find level before or after
 
+# Once every drain has been applied the rows are turned into per-minute entries - lazily, so each
+# entry only exists while it is being written out
+historical_data = ({'timestamp': timestamp, 'cauldron_levels': dict(zip(cauldron_ids, row))}
+                   for timestamp, row in zip(timestamps, level_rows))
+
 # Prepare output
 output_hist = {
     'metadata': {
-        'start_date': start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-        'end_date': end_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'start_date': format_timestamp(start_date),
+        'end_date': format_timestamp(end_date),
         'interval_minutes': 1,
         'fill_rates_l_per_min': fill_rates,  # Fill rates are constant for each cauldron throughout time
         'drain_rates_l_per_min': drain_rates,  # Base drain rates per cauldron (different for each)
@@ -984,20 +993,15 @@ output_drains = {
 
 # Save files
 print("\nSaving files...")
-with open('historical_data.json', 'w') as f:
-    json.dump(output_hist, f, indent=2)
-
-with open('transport_tickets.json', 'w') as f:
-    json.dump(output_tickets, f, indent=2)
-
-with open('unreported_drains.json', 'w') as f:
-    json.dump(output_drains, f, indent=2)
+save_json_stream('historical_data.json', output_hist, 'data')  # One entry per minute - by far the largest file
+save_json('transport_tickets.json', output_tickets)
+save_json('unreported_drains.json', output_drains)
 
 print("\n" + "=" * 70)
 print("✅ Data regeneration complete!")
 print("=" * 70)
 print(f"   Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-print(f"   Total minutes: {len(historical_data):,}")
+print(f"   Total minutes: {len(level_rows):,}")
 print(f"   Transport tickets: {len(transport_tickets)}")
 underreported_count = sum(1 for t in transport_tickets if t.get('is_suspicious') and t.get('suspicious_type') == 'underreported')
 suspicious_count = sum(1 for t in transport_tickets if t.get('is_suspicious'))